@@ -1,94 +1,138 @@
-# """
-# Flask + python-telegram-bot (v21+) webhook application for Render
-# ——————————————————————————————————————————
-# ✓ Registers PTB handlers
-# ✓ Adds keep-alive heartbeat
-# ✓ Sets webhook only after dispatcher is running
-# """
-
-# import os
-# import logging
-# import asyncio
-# from flask import Flask, request, abort
-# from telegram import Update
-# from telegram.ext import Application, AIORateLimiter
-
-# from bot.handlers import register_handlers
-# from bot.keep_alive import add_keep_alive     # <-- new import
-
-# # ────────────────  ENV  ────────────────
-# TOKEN  = os.environ["BOT_TOKEN"]
-# SECRET = os.environ["WEBHOOK_SECRET"]
-
-# # ───────────────  LOGGING  ─────────────
-# logging.basicConfig(
-#     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-#     level=logging.INFO,
-# )
-# logger = logging.getLogger(__name__)
-
-# # ───────────────  Flask  ───────────────
-# app = Flask(__name__)
-
-# # ─────────  PTB Application  ───────────
-# application = (
-#     add_keep_alive(                       # inject the heartbeat
-#         Application.builder()
-#         .token(TOKEN)
-#         .rate_limiter(AIORateLimiter())
-#     )
-#     .build()                              # finally build the Application
-# )
-
-# register_handlers(application)
-
-# # ───────────  Dispatcher bg task  ───────────
-# async def _run_bot() -> None:
-#     await application.initialize()
-#     await application.start()
-
-#     # Webhook is set *after* dispatcher is ready
-#     host = os.getenv("RENDER_EXTERNAL_HOSTNAME")
-#     if host:
-#         url = f"https://{host}/webhook/{SECRET}"
-#         await application.bot.set_webhook(url=url, drop_pending_updates=True)
-#         logger.info("Webhook set → %s", url)
-
-#     logger.info("PTB dispatcher started ✅")
-
-# # start the dispatcher once at boot
-# asyncio.get_event_loop().create_task(_run_bot())
-
-# # ────────────  Webhook route  ───────────
-# @app.post(f"/webhook/{SECRET}")
-# def telegram_webhook():
-#     if request.headers.get("content-type") == "application/json":
-#         update = Update.de_json(request.get_json(force=True), application.bot)
-#         application.update_queue.put_nowait(update)
-#         return {"ok": True}
-#     abort(403)
-
 # app.py
 import os
+import hmac
+import signal
+import asyncio
 import logging
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters
-from telegram import Update
-from bot.handlers import register_handlers
-from bot.keep_alive import launch_keep_alive
 from dotenv import load_dotenv
 
-load_dotenv()  # Load .env for local development
+load_dotenv()  # Load .env for local development (לפני ה-import של bot.*, שקוראים משתני סביבה)
 
-BOT_TOKEN = os.getenv("BOT_TOKEN")
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+from bot.handlers import register_handlers
+from bot.keep_alive import make_web_app, start_server
+from bot import workers
+from bot.sessions import SESSIONS
+from bot.outbound import TokenBucketRateLimiter
+from bot.jobs import UPLOADS
+from bot.quiz import SETS
+from bot.warmup import warm_up
 
-def main():
-    logging.basicConfig(format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
-    application = Application.builder().token(BOT_TOKEN).build()
+BOT_TOKEN = os.getenv("BOT_TOKEN")
+# שרת Bot API אחר (שרת מקומי של טלגרם / ה-fake של bench/) – ברירת מחדל api.telegram.org
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "").rstrip("/")
+
+# ─────────────  Webhook (אם מוגדר) – אחרת polling  ─────────────
+_host          = os.getenv("RENDER_EXTERNAL_HOSTNAME")
+WEBHOOK_URL    = os.getenv("WEBHOOK_URL") or (f"https://{_host}" if _host else "")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_PATH   = "/webhook"
+
+logger = logging.getLogger(__name__)
+
+
+async def _on_shutdown(application: Application) -> None:
+    await UPLOADS.close()
+    workers.shutdown()
+    SESSIONS.close()
+    SETS.close()
+
+
+# במצב polling שרת הבריאות עולה ויורד יחד עם ה-Application, באותו loop
+_http_runner: web.AppRunner | None = None
+
+async def _start_http(application: Application) -> None:
+    global _http_runner
+    _http_runner = await start_server(make_web_app(application))
+    # רץ ברקע במקביל לתחילת ה-polling; עדכונים לא מחכים לו
+    application.create_task(warm_up(), name="warm_up")
+
+async def _stop_http(application: Application) -> None:
+    if _http_runner is not None:
+        await _http_runner.cleanup()
+
+
+def build_application(webhook: bool) -> Application:
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(True)   # העלאה שמוזרמת לא חוסמת לחיצות של משתמשים אחרים
+        .rate_limiter(TokenBucketRateLimiter())
+        .post_shutdown(_on_shutdown)
+    )
+    if TELEGRAM_API_URL:
+        builder = builder.base_url(f"{TELEGRAM_API_URL}/bot").base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+    if webhook:
+        builder = builder.updater(None)    # העדכונים מגיעים מה-route למטה, אין צורך ב-Updater
+    else:
+        builder = builder.post_init(_start_http).post_stop(_stop_http)
+    application = builder.build()
     register_handlers(application)
+    return application
+
+
+# ─────────────  מצב webhook: שרת aiohttp אחד, באותו loop של PTB  ─────────────
+async def telegram_webhook(request: web.Request) -> web.Response:
+    token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not hmac.compare_digest(token, WEBHOOK_SECRET):
+        return web.Response(status=403)
+    application: Application = request.app["ptb"]
+    try:
+        update = Update.de_json(await request.json(), application.bot)
+    except ValueError:
+        return web.Response(status=400)
+    await application.update_queue.put(update)
+    return web.json_response({"ok": True})
+
+
+async def run_webhook() -> None:
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET is required in webhook mode")
+    application = build_application(webhook=True)
+    web_app = make_web_app(application)
+    web_app.router.add_post(WEBHOOK_PATH, telegram_webhook)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    runner = await start_server(web_app)
+    try:
+        async with application:                 # initialize / shutdown
+            await application.start()
+            url = WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH
+            # ה-webhook נרשם רק אחרי שה-dispatcher רץ
+            await application.bot.set_webhook(
+                url=url,
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=True,
+            )
+            logger.info("Webhook set → %s", url)
+            application.create_task(warm_up(), name="warm_up")
+            await stop.wait()
+            await application.stop()
+            await _on_shutdown(application)     # post_shutdown נקרא רק ע"י run_polling/run_webhook
+    finally:
+        await runner.cleanup()
+
+
+# ─────────────  מצב polling (פיתוח מקומי)  ─────────────
+def run_polling() -> None:
+    application = build_application(webhook=False)
     print("🤖 Bot is running...")
     application.run_polling()
 
+
+def main():
+    logging.basicConfig(format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+    if WEBHOOK_URL:
+        asyncio.run(run_webhook())
+    else:
+        run_polling()
+
 if __name__ == "__main__":
-    launch_keep_alive()
     main()
-
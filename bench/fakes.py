@@ -0,0 +1,195 @@
+# bench/fakes.py  –  שרתי HTTP מקומיים שמחקים את Bot API של טלגרם ואת OpenAI, עם השהיה מוגדרת
+import re, json, time, random, asyncio, hashlib
+from collections import Counter
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from bench.fixtures import WORDS
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "EduGo bench", "username": "edugo_bench_bot"}
+
+
+async def serve(app: web.Application) -> Tuple[web.AppRunner, str]:
+    """מריץ את האפליקציה על פורט פנוי ב-127.0.0.1; מחזיר (runner, base url)."""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+# ─────────────  Bot API  ─────────────
+class FakeTelegram:
+    """
+    עונה לכל מתודה של Bot API ש-PTB קורא לה בזרימות של הבוט.
+    שומר לכל צ'אט את המקלדת האחרונה שנשלחה (message_id + callback_data), כך שהמשתמש המדומה
+    יכול "ללחוץ" עליה, ומאפשר לחכות להודעה הבאה עם מקלדת (שאלה ראשונה אחרי העלאה).
+    """
+
+    def __init__(self, token: str, latency: float = 0.0):
+        self.token = token
+        self.latency = latency
+        self.files: Dict[str, bytes] = {}
+        self.keyboards: Dict[int, Tuple[int, List[str]]] = {}
+        self.calls: Counter = Counter()
+        self._ids = count(1)
+        self._waiters: Dict[int, asyncio.Future] = {}
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_route("*", f"/bot{self.token}/{{method}}", self._method)
+        app.router.add_get(f"/file/bot{self.token}/{{path:.*}}", self._file)
+        return app
+
+    def expect_keyboard(self, chat_id: int) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[chat_id] = fut
+        return fut
+
+    def _message(self, chat_id: int, message_id: Optional[int] = None, text: str = "") -> Dict:
+        return {
+            "message_id": message_id or next(self._ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": text,
+        }
+
+    def _keyboard(self, chat_id: int, message_id: int, markup: Optional[str]) -> None:
+        if not markup:
+            return
+        rows = json.loads(markup).get("inline_keyboard") or []
+        data = [b["callback_data"] for row in rows for b in row if "callback_data" in b]
+        if not data:
+            return
+        self.keyboards[chat_id] = (message_id, data)
+        fut = self._waiters.pop(chat_id, None)
+        if fut is not None and not fut.done():
+            fut.set_result((message_id, data))
+
+    async def _method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            result = BOT_USER
+        elif method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            result = self._message(chat_id, text=params.get("text", ""))
+            self._keyboard(chat_id, result["message_id"], params.get("reply_markup"))
+        elif method == "editMessageText":
+            chat_id = int(params["chat_id"])
+            result = self._message(chat_id, int(params["message_id"]), params.get("text", ""))
+            self._keyboard(chat_id, result["message_id"], params.get("reply_markup"))
+        elif method == "getFile":
+            file_id = params["file_id"]
+            result = {"file_id": file_id, "file_unique_id": file_id,
+                      "file_size": len(self.files.get(file_id, b"")), "file_path": f"docs/{file_id}"}
+        else:
+            # answerCallbackQuery / deleteWebhook / setWebhook / ...
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def _file(self, request: web.Request) -> web.Response:
+        data = self.files.get(request.match_info["path"].rsplit("/", 1)[-1])
+        if data is None:
+            return web.Response(status=404)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.Response(body=data, content_type="application/octet-stream")
+
+
+# ─────────────  OpenAI  ─────────────
+class FakeOpenAI:
+    """
+    /v1/chat/completions, רגיל ובהזרמה (SSE). התשובה היא מערך JSON של שאלות תקינות,
+    שונות לכל פרומפט, כך שסינון הכפולים בבוט לא מעוות את התוצאה.
+    latency = זמן כולל לתשובה; בהזרמה 20% ממנו עד ה-chunk הראשון והשאר מתפזר על ה-chunks.
+    error_rate = חלק הבקשות שמקבלות 500 (לבדיקת retries / circuit breaker).
+    """
+
+    def __init__(self, latency: float = 1.0, chunks: int = 24, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.chunks = chunks
+        self.error_rate = error_rate
+        self.rnd = random.Random(seed)
+        self.calls: Counter = Counter()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._completions)
+        return app
+
+    @staticmethod
+    def _questions(prompt: str) -> List[Dict]:
+        m = re.search(r"בדיוק (\d+) שאלות", prompt)
+        n = int(m.group(1)) if m else 6
+        tag = hashlib.md5(prompt.encode()).hexdigest()[:8]
+        # טקסט שונה באמת לכל שאלה – הבוט זורק כמעט-כפולות (bot/dedupe.py)
+        rnd = random.Random(tag)
+        words = lambda k: " ".join(rnd.choice(WORDS) for _ in range(k))
+        out = []
+        for i in range(n):
+            if i % 2:
+                out.append({"question": f"{words(10)} ({tag}-{i})", "type": "true_false",
+                            "options": ["נכון", "לא נכון"], "correct": "נכון"})
+            else:
+                out.append({"question": f"{words(10)} ({tag}-{i})?", "type": "multiple",
+                            "options": [f"{l}. {words(3)}" for l in "אבגדה"], "correct": "ג"})
+        return out
+
+    async def _completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        stream = bool(body.get("stream"))
+        self.calls["stream" if stream else "complete"] += 1
+
+        if self.error_rate and self.rnd.random() < self.error_rate:
+            self.calls["error"] += 1
+            await asyncio.sleep(self.latency * 0.2)
+            return web.json_response({"error": {"message": "bench injected failure", "type": "server_error"}},
+                                     status=500)
+
+        content = json.dumps(self._questions(prompt), ensure_ascii=False)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                 "total_tokens": (len(prompt) + len(content)) // 4}
+        base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body.get("model", "bench")}
+
+        if not stream:
+            await asyncio.sleep(self.latency)
+            return web.json_response({
+                **base, "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await resp.prepare(request)
+        await asyncio.sleep(self.latency * 0.2)
+        step = max(1, len(content) // self.chunks)
+        pieces = [content[i:i + step] for i in range(0, len(content), step)]
+        gap = self.latency * 0.8 / max(1, len(pieces))
+
+        async def event(payload: Dict) -> None:
+            data = json.dumps({**base, "object": "chat.completion.chunk", **payload}, ensure_ascii=False)
+            await resp.write(f"data: {data}\n\n".encode())
+
+        for piece in pieces:
+            await event({"choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+            await asyncio.sleep(gap)
+        await event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await event({"choices": [], "usage": usage})
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
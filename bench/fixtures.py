@@ -0,0 +1,98 @@
+# bench/fixtures.py  –  קבצי PDF / DOCX / PPTX סינתטיים להעלאות בבנצ'מרק (נוצרים בזיכרון, דטרמיניסטיים לפי seed)
+import io
+import random
+from typing import List, Tuple
+
+WORDS = (
+    "תא ממברנה חלבון אנזים גן כרומוזום תורשה אבולוציה מערכת עצבים נוירון סינפסה הורמון "
+    "אנרגיה כוח תאוצה מסה מהירות גל תדר אור עדשה מעגל זרם מתח התנגדות שדה מגנטי "
+    "מלחמה אימפריה מהפכה חוקה פרלמנט כלכלה סחר מסחר הגירה חברה תרבות דת "
+    "cell membrane protein enzyme energy force wave circuit voltage empire revolution trade"
+).split()
+
+
+def paragraphs(seed: int, count: int, words: int = 60) -> List[str]:
+    rnd = random.Random(seed)
+    out = []
+    for i in range(count):
+        body = " ".join(rnd.choice(WORDS) for _ in range(words))
+        out.append(f"פרק {i + 1} ({seed}). {body}.")
+    return out
+
+
+def make_docx(seed: int, count: int = 20) -> bytes:
+    from docx import Document
+    doc = Document()
+    for p in paragraphs(seed, count):
+        doc.add_paragraph(p)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def make_pptx(seed: int, slides: int = 10) -> bytes:
+    from pptx import Presentation
+    from pptx.util import Inches
+    prs = Presentation()
+    for p in paragraphs(seed, slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(6))
+        box.text_frame.word_wrap = True
+        box.text_frame.text = p
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
+
+
+def make_pdf(seed: int, pages: int = 10) -> bytes:
+    """PDF מינימלי (Type1 Helvetica, טקסט ASCII) – מספיק ל-pypdf לחלץ ממנו טקסט, בלי תלות בספריית כתיבה."""
+    rnd = random.Random(seed)
+    ascii_words = [w for w in WORDS if w.isascii()]
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = len(objects) + 2 * pages + 1           # אובייקט ה-Pages נכתב אחרי כל העמודים
+    kids = []
+    for n in range(pages):
+        lines = [" ".join(rnd.choice(ascii_words) for _ in range(12)) for _ in range(30)]
+        ops = [b"BT /F1 10 Tf 50 780 Td 14 TL"]
+        ops.append(f"(Page {n + 1} seed {seed}) Tj T*".encode())
+        ops += [f"({line}) Tj T*".encode() for line in lines]
+        ops.append(b"ET")
+        stream = b"\n".join(ops)
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 %d 0 R >> >> "
+            b"/Contents %d 0 R >>" % (pages_id, font, content)))
+    assert add(b"<< /Type /Pages /Kids [%s] /Count %d >>"
+               % (b" ".join(b"%d 0 R" % k for k in kids), pages)) == pages_id
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (i, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.writelines(b"%010d 00000 n \n" % off for off in offsets)
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref))
+    return out.getvalue()
+
+
+MAKERS = {".pdf": make_pdf, ".docx": make_docx, ".pptx": make_pptx}
+
+
+def fixture_set(distinct: int, seed: int = 0) -> List[Tuple[str, bytes]]:
+    """distinct קבצים שונים, בסבב pdf → docx → pptx: [(שם קובץ, bytes)]."""
+    out = []
+    kinds = list(MAKERS)
+    for i in range(distinct):
+        ext = kinds[i % len(kinds)]
+        out.append((f"bench_{seed}_{i}{ext}", MAKERS[ext](seed * 1000 + i)))
+    return out
@@ -0,0 +1,283 @@
+# bench/run.py  –  בנצ'מרק / בדיקת עומס אופליין: משתמשים מדומים → register_handlers, מול Bot API ו-OpenAI מקומיים
+"""
+מריץ את הבוט האמיתי (build_application מ-app.py) בתוך התהליך, ומזרים אליו עדכונים סינתטיים:
+  • משתמשי מאגר: לחיצה על 🗂️ ואז --answers לחיצות על כפתורי תשובה
+  • מעלים: העלאת PDF / DOCX / PPTX שנוצרו בזיכרון, המתנה לשאלה הראשונה, ואז לחיצות תשובה
+טלגרם ו-OpenAI מוחלפים בשרתי aiohttp מקומיים (bench/fakes.py) עם השהיה מוגדרת.
+
+    python -m bench.run --users 2000 --uploads 40 --concurrency 200
+    python -m bench.run --json out.json
+    python -m bench.run --baseline out.json --max-regression 0.2     # exit 1 אם p99 / throughput נסוגו
+
+זה לא חלק מ-pytest; מריצים ידנית / ב-CI לפני deploy. RSS כולל גם את שרתי ה-fake (אותו תהליך).
+"""
+import os, sys, json, time, random, asyncio, argparse, resource, tempfile
+from collections import Counter, defaultdict
+from itertools import count
+from typing import Dict, List
+
+from bench.fakes import BOT_USER, FakeOpenAI, FakeTelegram, serve
+from bench.fixtures import fixture_set
+
+TOKEN = "123456:bench"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="EduGo bot offline load test")
+    p.add_argument("--users", type=int, default=1000, help="simulated bank-quiz users")
+    p.add_argument("--uploads", type=int, default=30, help="simulated users that upload a file")
+    p.add_argument("--distinct-docs", type=int, default=6, help="distinct fixture files (the rest are re-uploads)")
+    p.add_argument("--answers", type=int, default=5, help="answer taps per user")
+    p.add_argument("--concurrency", type=int, default=200, help="users active at the same time")
+    p.add_argument("--think", type=float, default=0.0, help="seconds between a user's taps")
+    p.add_argument("--tg-latency", type=float, default=0.02, help="fake Bot API latency per call (s)")
+    p.add_argument("--llm-latency", type=float, default=1.5, help="fake OpenAI total latency per completion (s)")
+    p.add_argument("--llm-error-rate", type=float, default=0.0)
+    p.add_argument("--upload-timeout", type=float, default=120.0)
+    p.add_argument("--no-rate-limit", action="store_true", help="disable the outbound per-chat / global limiter")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--json", help="write the report as JSON to this path")
+    p.add_argument("--baseline", help="JSON report to compare against")
+    p.add_argument("--max-regression", type=float, default=0.2, help="allowed p99 / throughput regression (0.2 = 20%%)")
+    return p.parse_args(argv)
+
+
+# ─────────────  מדידה  ─────────────
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def rss_mb() -> Dict[str, float]:
+    current = 0.0
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    current = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss ב-KB בלינוקס, ב-bytes ב-macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "rss_mb": round(current, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+class Simulation:
+    def __init__(self, application, tg: FakeTelegram, args: argparse.Namespace):
+        from telegram import Update
+        from bot.jobs import UPLOADS
+        self.Update = Update
+        self.uploads = UPLOADS
+        self.application = application
+        self.tg = tg
+        self.args = args
+        self.rnd = random.Random(args.seed)
+        self._ids = count(1)
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    # ─────────────  עדכונים סינתטיים  ─────────────
+    def _update(self, **payload):
+        return self.Update.de_json({"update_id": next(self._ids), **payload}, self.application.bot)
+
+    @staticmethod
+    def _user(uid: int) -> Dict:
+        return {"id": uid, "is_bot": False, "first_name": f"user{uid}", "language_code": "he"}
+
+    def message(self, uid: int, **fields):
+        return self._update(message={
+            "message_id": next(self._ids), "date": int(time.time()),
+            "chat": {"id": uid, "type": "private"}, "from": self._user(uid), **fields,
+        })
+
+    def callback(self, uid: int, message_id: int, data: str):
+        return self._update(callback_query={
+            "id": str(next(self._ids)), "from": self._user(uid), "chat_instance": str(uid), "data": data,
+            "message": {"message_id": message_id, "date": int(time.time()),
+                        "chat": {"id": uid, "type": "private"}, "from": BOT_USER, "text": "…"},
+        })
+
+    async def dispatch(self, op: str, update) -> None:
+        t0 = time.perf_counter()
+        try:
+            await self.application.process_update(update)
+        except Exception as e:
+            self.errors[op] += 1
+            print(f"⚠️ {op}: {type(e).__name__}: {e}")
+        finally:
+            self.latency[op].append(time.perf_counter() - t0)
+
+    # ─────────────  תרחישים  ─────────────
+    async def _answer_loop(self, uid: int) -> None:
+        for _ in range(self.args.answers):
+            kb = self.tg.keyboards.get(uid)
+            if kb is None:
+                self.errors["answer_no_keyboard"] += 1
+                return
+            message_id, data = kb
+            if self.args.think:
+                await asyncio.sleep(self.args.think)
+            await self.dispatch("answer", self.callback(uid, message_id, self.rnd.choice(data)))
+
+    async def bank_user(self, uid: int) -> None:
+        await self.dispatch("menu_bank", self.message(uid, text="🗂️ שאלות מהמַאגר"))
+        await self._answer_loop(uid)
+
+    async def upload_user(self, uid: int, name: str, data: bytes, unique_id: str) -> None:
+        file_id = f"{unique_id}_{uid}"            # לכל משתמש file_id משלו, file_unique_id משותף לאותו קובץ
+        self.tg.files[file_id] = data
+        first = self.tg.expect_keyboard(uid)
+        t0 = time.perf_counter()
+        await self.dispatch("upload_ack", self.message(uid, document={
+            "file_id": file_id, "file_unique_id": unique_id, "file_name": name, "file_size": len(data),
+        }))
+        # השאלה הראשונה נשלחת מתוך העבודה בתור, לפני שהיא מסתיימת; עבודה שנגמרה (או לא נכנסה לתור)
+        # בלי מקלדת = נדחתה / נכשלה
+        deadline = t0 + self.args.upload_timeout
+        while not first.done() and self.uploads.busy(uid) and time.perf_counter() < deadline:
+            await asyncio.wait([first], timeout=0.2)
+        if not first.done():
+            first.cancel()
+            self.errors["upload_timeout" if self.uploads.busy(uid) else "upload_no_question"] += 1
+            return
+        self.latency["upload_first_question"].append(time.perf_counter() - t0)
+        await self._answer_loop(uid)
+
+    async def run(self) -> float:
+        files = fixture_set(max(1, self.args.distinct_docs), self.args.seed)
+        sem = asyncio.Semaphore(self.args.concurrency)
+        jobs = [("bank", uid) for uid in range(1000, 1000 + self.args.users)]
+        jobs += [("upload", uid) for uid in range(10 ** 6, 10 ** 6 + self.args.uploads)]
+        self.rnd.shuffle(jobs)
+
+        async def one(kind: str, uid: int) -> None:
+            async with sem:
+                if kind == "bank":
+                    await self.bank_user(uid)
+                else:
+                    idx = uid % len(files)
+                    name, data = files[idx]
+                    await self.upload_user(uid, name, data, f"doc{self.args.seed}_{idx}")
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(kind, uid) for kind, uid in jobs))
+        return time.perf_counter() - t0
+
+
+# ─────────────  דוח  ─────────────
+def build_report(sim: Simulation, wall: float, tg: FakeTelegram, llm: FakeOpenAI) -> Dict:
+    from bot.metrics import STAGE_SECONDS
+    ops = {}
+    for op, values in sorted(sim.latency.items()):
+        ops[op] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1),
+            "max_ms": round(max(values) * 1000, 1),
+        }
+    stages = {}
+    for values, series in STAGE_SECONDS._series.items():
+        n = sum(series[:-1])            # דליים + ‎+Inf; האיבר האחרון הוא הסכום
+        stages[values[0]] = {"count": n, "mean_ms": round(series[-1] / max(1, n) * 1000, 1)}
+    total = sum(len(v) for v in sim.latency.values())
+    return {
+        "wall_s": round(wall, 2),
+        "throughput_ops_s": round(total / wall, 1) if wall else 0.0,
+        "ops": ops,
+        "errors": dict(sim.errors),
+        "bot_stages": stages,
+        "telegram_calls": dict(tg.calls),
+        "openai_calls": dict(llm.calls),
+        **rss_mb(),
+    }
+
+
+def print_report(report: Dict) -> None:
+    print(f"\n{'op':<24}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for op, r in report["ops"].items():
+        print(f"{op:<24}{r['count']:>8}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}")
+    print(f"\nwall {report['wall_s']}s   throughput {report['throughput_ops_s']} ops/s")
+    print(f"RSS {report['rss_mb']} MB (peak {report['peak_rss_mb']} MB, "
+          f"extract workers peak {report['children_peak_rss_mb']} MB)")
+    if report["errors"]:
+        print("errors:", report["errors"])
+    print("bot stages (mean ms):", {k: v["mean_ms"] for k, v in sorted(report["bot_stages"].items())})
+    print("telegram calls:", report["telegram_calls"])
+    print("openai calls:", report["openai_calls"])
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    problems = []
+    for op, base in baseline.get("ops", {}).items():
+        cur = report["ops"].get(op)
+        if cur and base["p99_ms"] and cur["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            problems.append(f"{op}: p99 {base['p99_ms']} → {cur['p99_ms']} ms")
+    if baseline.get("throughput_ops_s") and \
+            report["throughput_ops_s"] < baseline["throughput_ops_s"] * (1 - tolerance):
+        problems.append(f"throughput {baseline['throughput_ops_s']} → {report['throughput_ops_s']} ops/s")
+    return problems
+
+
+# ─────────────  main  ─────────────
+def bot_env(tg_url: str, llm_url: str) -> None:
+    # הבוט קורא את ההגדרות שלו בזמן import – מגדירים לפני
+    os.environ.update({
+        "BOT_TOKEN": TOKEN,
+        "TELEGRAM_API_URL": tg_url,
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{llm_url}/v1",
+        "QA_CACHE_DIR": tempfile.mkdtemp(prefix="edugo_bench_"),
+        "SESSION_STORE": "memory",
+        "CALLBACK_SECRET": "bench",
+    })
+    for key in ("WEBHOOK_URL", "RENDER_EXTERNAL_HOSTNAME"):
+        os.environ.pop(key, None)
+
+
+async def main(args: argparse.Namespace) -> int:
+    tg = FakeTelegram(TOKEN, args.tg_latency)
+    llm = FakeOpenAI(args.llm_latency, error_rate=args.llm_error_rate, seed=args.seed)
+    tg_runner, tg_url = await serve(tg.app())
+    llm_runner, llm_url = await serve(llm.app())
+
+    bot_env(tg_url, llm_url)
+    from bot import outbound, workers
+    if args.no_rate_limit:
+        outbound.GLOBAL_RATE = outbound.CHAT_RATE = outbound.GROUP_RATE = outbound.CHAT_BURST = 1e9
+    from app import build_application
+    from bot.jobs import UPLOADS
+
+    application = build_application(webhook=True)
+    sim = Simulation(application, tg, args)
+    try:
+        async with application:
+            wall = await sim.run()
+            await UPLOADS.close()
+    finally:
+        workers.shutdown()
+        await tg_runner.cleanup()
+        await llm_runner.cleanup()
+
+    report = build_report(sim, wall, tg, llm)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.max_regression)
+        for p in problems:
+            print("❌ regression:", p)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
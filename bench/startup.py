@@ -0,0 +1,176 @@
+# bench/startup.py  –  בנצ'מרק עלייה קרה: זמן import, זמן עד שהבוט מוכן, והעלאה הראשונה עם / בלי warm-up
+"""
+כל מדידה רצה בתהליך Python חדש, כדי שה-import באמת יהיה קר:
+  • import   – `python -X importtime -c "import app"` (ה-import הנקי, בלי ה-fakes), + המודולים הכבדים
+  • ready    – import + build_application + initialize (getMe מול ה-fake), בתהליך שמריץ גם את ה-fakes
+  • first_*  – /start ראשון מיד אחרי העלייה, והעלאה ראשונה (אחרי --idle) עד השאלה הראשונה;
+               פעם עם warm-up ופעם בלי
+
+    python -m bench.startup
+    python -m bench.startup --runs 5 --json startup.json
+    python -m bench.startup --baseline startup.json --max-regression 0.2    # exit 1 אם משהו נסוג
+"""
+import os, sys, json, time, asyncio, argparse, statistics, subprocess
+from typing import Dict, List, Tuple
+
+from bench.run import TOKEN, bot_env
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="EduGo bot cold-start benchmark")
+    p.add_argument("--runs", type=int, default=3, help="fresh processes per measurement")
+    p.add_argument("--llm-latency", type=float, default=0.3, help="fake OpenAI total latency per completion (s)")
+    p.add_argument("--idle", type=float, default=2.0, help="seconds between startup and the first upload")
+    p.add_argument("--top", type=int, default=10, help="heaviest imports to list")
+    p.add_argument("--json", help="write the report as JSON to this path")
+    p.add_argument("--baseline", help="JSON report to compare against")
+    p.add_argument("--max-regression", type=float, default=0.2, help="allowed regression (0.2 = 20%%)")
+    p.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    p.add_argument("--no-warmup", action="store_true", help=argparse.SUPPRESS)
+    return p.parse_args(argv)
+
+
+# ─────────────  import  ─────────────
+def _importtime() -> Tuple[float, List[Tuple[str, float]]]:
+    """(זמן ה-import של app ב-ms, [(מודול, ms מצטבר)] לייבואים הישירים)."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                         capture_output=True, text=True, check=True).stderr
+    total, modules = 0.0, []
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            ms = int(cumulative) / 1000
+        except ValueError:
+            continue                            # שורת הכותרת
+        depth = (len(name) - len(name.lstrip())) // 2
+        if name.strip() == "app":
+            total = ms
+        elif depth <= 1:
+            modules.append((name.strip(), ms))
+    return total, sorted(modules, key=lambda m: -m[1])
+
+
+# ─────────────  תהליך הבן: עלייה + משתמש ראשון  ─────────────
+async def child(args: argparse.Namespace) -> Dict:
+    from bench.fakes import FakeOpenAI, FakeTelegram, serve
+    from bench.fixtures import make_pdf
+    from bench.run import Simulation
+
+    tg, llm = FakeTelegram(TOKEN), FakeOpenAI(args.llm_latency)
+    tg_runner, tg_url = await serve(tg.app())
+    llm_runner, llm_url = await serve(llm.app())
+    bot_env(tg_url, llm_url)
+    if args.no_warmup:
+        os.environ["WARMUP"] = "0"
+
+    out: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    from app import build_application
+    from bot import outbound, workers
+    from bot.jobs import UPLOADS
+    from bot.warmup import stats, warm_up
+    out["import_in_process"] = time.perf_counter() - t0
+    # המגביל של טלגרם (הודעה לשנייה לצ'אט) היה מסתיר את זמן העיבוד של ההעלאה עצמה
+    outbound.GLOBAL_RATE = outbound.CHAT_RATE = outbound.GROUP_RATE = outbound.CHAT_BURST = 1e9
+
+    application = build_application(webhook=True)
+    sim = Simulation(application, tg, argparse.Namespace(seed=0, answers=0, think=0.0, upload_timeout=60.0))
+    try:
+        async with application:
+            out["ready"] = time.perf_counter() - t0
+            application.create_task(warm_up())         # כמו ב-app.py, מיד אחרי שהבוט מקבל עדכונים
+            await sim.dispatch("first_start", sim.message(1, text="/start"))
+            await asyncio.sleep(args.idle)             # המשתמש הראשון שמעלה קובץ מגיע קצת אחרי העלייה
+            for i, uid in enumerate((2, 3)):
+                await sim.upload_user(uid, f"startup_{i}.pdf", make_pdf(i), f"startup{i}")
+            await UPLOADS.close()
+    finally:
+        workers.shutdown()
+        await tg_runner.cleanup()
+        await llm_runner.cleanup()
+
+    uploads = sim.latency["upload_first_question"]
+    out["first_start"] = sim.latency["first_start"][0]
+    if len(uploads) == 2:
+        out["first_upload"], out["second_upload"] = uploads
+    out["warmup_total"] = stats["total"]
+    return {k: round(v * 1000, 1) for k, v in out.items()}
+
+
+def _run_child(args: argparse.Namespace, warmup: bool) -> Dict:
+    cmd = [sys.executable, "-m", "bench.startup", "--child", "--llm-latency", str(args.llm_latency),
+           "--idle", str(args.idle)]
+    if not warmup:
+        cmd.append("--no-warmup")
+    res = subprocess.run(cmd, capture_output=True, text=True)
+    if res.returncode != 0:
+        raise RuntimeError(res.stderr[-2000:])
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def _median(runs: List[Dict]) -> Dict[str, float]:
+    keys = set().union(*runs)
+    return {k: statistics.median(r[k] for r in runs if k in r) for k in sorted(keys)}
+
+
+# ─────────────  דוח  ─────────────
+def build_report(args: argparse.Namespace) -> Dict:
+    t_python = []
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        t_python.append((time.perf_counter() - t0) * 1000)
+
+    imports = [_importtime() for _ in range(args.runs)]
+    return {
+        "python_ms": round(statistics.median(t_python), 1),
+        "import_ms": round(statistics.median(t for t, _ in imports), 1),
+        "heaviest_imports": [(m, round(ms, 1)) for m, ms in imports[-1][1][:args.top]],
+        "warmup": _median([_run_child(args, True) for _ in range(args.runs)]),
+        "no_warmup": _median([_run_child(args, False) for _ in range(args.runs)]),
+    }
+
+
+def print_report(report: Dict) -> None:
+    print(f"\n🐍 python itself       {report['python_ms']:8.1f} ms")
+    print(f"📦 import app          {report['import_ms']:8.1f} ms")
+    for name, ms in report["heaviest_imports"]:
+        print(f"     {name:<34} {ms:8.1f} ms")
+    print(f"\n{'(ms, median)':<20} {'warm-up':>10} {'no warm-up':>12}")
+    for key in report["warmup"]:
+        print(f"  {key:<18} {report['warmup'][key]:>10.1f} {report['no_warmup'].get(key, 0):>12.1f}")
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    problems = []
+    checks = [("import_ms", report["import_ms"], baseline.get("import_ms"))]
+    checks += [(f"warmup.{k}", report["warmup"].get(k), baseline.get("warmup", {}).get(k))
+               for k in ("ready", "first_start", "first_upload")]
+    for name, now, base in checks:
+        if now and base and now > base * (1 + tolerance):
+            problems.append(f"{name} {base:.1f} → {now:.1f} ms")
+    return problems
+
+
+def main(args: argparse.Namespace) -> int:
+    if args.child:
+        print(json.dumps(asyncio.run(child(args))))
+        return 0
+    report = build_report(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.max_regression)
+        for p in problems:
+            print("❌ regression:", p)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,114 @@
+# bot/bank.py  –  מאגר שאלות בזיכרון, עם אינדקס לפי סוג וטעינה מחדש לפי mtime
+import json, random, hashlib, threading, time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from bot.dedupe import clean
+
+BANK_PATH          = Path("data/bank.json")
+RELOAD_CHECK_SECS  = 2.0      # כל כמה זמן לכל היותר בודקים mtime (stat אחד, לא קריאה)
+REQUIRED_KEYS      = ("question", "options", "type", "correct")
+
+
+class _Snapshot(NamedTuple):
+    mtime: float
+    questions: Tuple[Dict, ...]
+    by_type: Dict[str, Tuple[Dict, ...]]
+    by_id: Dict[str, Dict]
+
+
+_EMPTY = _Snapshot(0.0, (), {}, {})
+
+
+def question_id(text: str) -> str:
+    """מזהה יציב לפי תוכן השאלה – נשאר זהה גם אחרי טעינה מחדש של הקובץ."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:8]
+
+
+def _normalize(raw) -> Optional[Dict]:
+    """מחזיר שאלה מנורמלת (רק המפתחות הנדרשים, מחרוזות חתוכות) או None אם אינה תקינה."""
+    if not isinstance(raw, dict) or not all(k in raw for k in REQUIRED_KEYS):
+        return None
+    options = raw["options"]
+    if not isinstance(options, list) or not options:
+        return None
+    question = str(raw["question"]).strip()
+    return {
+        "id": question_id(question),
+        "type": str(raw["type"]).strip().lower(),
+        "question": question,
+        "options": [str(o).strip() for o in options],
+        "correct": str(raw["correct"]).strip(),
+    }
+
+
+class QuestionBank:
+    """
+    עותק יחיד לכל התהליך של bank.json.
+    נטען פעם אחת, מוחזק כ-tuple של שאלות תקינות ומאונדקס לפי סוג.
+    אם ה-mtime של הקובץ משתנה – נבנה snapshot חדש ומוחלף באטומיות (השמה אחת).
+    """
+
+    def __init__(self, path: Path = BANK_PATH, check_every: float = RELOAD_CHECK_SECS):
+        self.path = Path(path)
+        self.check_every = check_every
+        self._snap = _EMPTY
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    # ─────────────  טעינה  ─────────────
+    def _load(self, mtime: float) -> _Snapshot:
+        raw = json.loads(self.path.read_text(encoding="utf-8"))
+        # אפשרויות שבורות (אותיות, תשובה שאינה אחת האפשרויות) וכמעט-כפולות נזרקות כבר בטעינה
+        questions = tuple(clean(map(_normalize, raw if isinstance(raw, list) else []), source="bank"))
+        by_type: Dict[str, List[Dict]] = {}
+        for q in questions:
+            by_type.setdefault(q["type"], []).append(q)
+        return _Snapshot(mtime, questions, {t: tuple(qs) for t, qs in by_type.items()},
+                         {q["id"]: q for q in questions})
+
+    def _current(self) -> _Snapshot:
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._snap
+        with self._lock:
+            if now < self._next_check:
+                return self._snap
+            self._next_check = now + self.check_every
+            try:
+                mtime = self.path.stat().st_mtime
+            except FileNotFoundError:
+                self._snap = _EMPTY
+                return self._snap
+            if mtime != self._snap.mtime:
+                try:
+                    self._snap = self._load(mtime)
+                except Exception as e:
+                    # קובץ באמצע עריכה / JSON שבור – ממשיכים עם ה-snapshot הקודם
+                    print("❌ שגיאה בטעינת המאגר:", e)
+            return self._snap
+
+    def reload(self) -> None:
+        self._next_check = 0.0
+        self._snap = self._snap._replace(mtime=-1.0)
+        self._current()
+
+    # ─────────────  גישה  ─────────────
+    def all(self) -> Tuple[Dict, ...]:
+        return self._current().questions
+
+    def by_type(self, qtype: str) -> Tuple[Dict, ...]:
+        return self._current().by_type.get(qtype.lower(), ())
+
+    def get(self, qid: str) -> Optional[Dict]:
+        return self._current().by_id.get(qid)
+
+    def __len__(self) -> int:
+        return len(self._current().questions)
+
+    def sample(self, k: int, qtype: Optional[str] = None) -> List[Dict]:
+        pool = self.by_type(qtype) if qtype else self.all()
+        return random.sample(pool, k=min(k, len(pool))) if pool else []
+
+
+BANK = QuestionBank()
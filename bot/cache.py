@@ -0,0 +1,200 @@
+# bot/cache.py  –  Cache דו-שכבתי: LRU בזיכרון מעל תיקייה מוגבלת בגודל בדיסק
+import os, json, time, threading, tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from bot.metrics import CACHE_SECONDS, Observed
+
+CACHE_DIR        = os.getenv("QA_CACHE_DIR", "/tmp/qa_cache")
+CACHE_TTL_SECS   = int(os.getenv("QA_CACHE_TTL_SECS", str(7 * 24 * 3600)))
+CACHE_MEM_ITEMS  = int(os.getenv("QA_CACHE_MEM_ITEMS", "256"))
+CACHE_MEM_BYTES  = int(os.getenv("QA_CACHE_MEM_MB", "16")) * 1024 * 1024
+CACHE_DISK_BYTES = int(os.getenv("QA_CACHE_DISK_MB", "100")) * 1024 * 1024
+
+
+class TwoTierCache:
+    """
+    get/set של ערכי JSON לפי מפתח.
+    שכבה 1: OrderedDict בזיכרון (LRU לפי מספר פריטים ובתים).
+    שכבה 2: קובץ JSON לכל מפתח, כתיבה אטומית (tmp + os.replace), סך הבתים מוגבל.
+    לשתי השכבות TTL לפי זמן הכתיבה. מונים ב-stats.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, ttl: float = CACHE_TTL_SECS,
+                 mem_items: int = CACHE_MEM_ITEMS, mem_bytes: int = CACHE_MEM_BYTES,
+                 disk_bytes: int = CACHE_DISK_BYTES, name: str = "qa"):
+        self.name = name
+        self.dir = Path(directory)
+        self.ttl = ttl
+        self.mem_items = mem_items
+        self.mem_bytes = mem_bytes
+        self.disk_bytes = disk_bytes
+        self._mem: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()   # key → (written_at, value, size)
+        self._mem_total = 0
+        self._disk: Optional["OrderedDict[str, Tuple[float, int]]"] = None      # key → (written_at, size), סדר LRU
+        self._disk_total = 0
+        self._lock = threading.RLock()
+        self.stats: Dict[str, int] = dict.fromkeys(
+            ("mem_hits", "disk_hits", "misses", "sets", "mem_evictions", "disk_evictions", "expired"), 0)
+        _CACHES.append(self)
+
+    # ─────────────  שכבת זיכרון  ─────────────
+    def _mem_put(self, key: str, written_at: float, value: Any, size: int) -> None:
+        old = self._mem.pop(key, None)
+        if old:
+            self._mem_total -= old[2]
+        if size > self.mem_bytes:
+            return
+        self._mem[key] = (written_at, value, size)
+        self._mem_total += size
+        while len(self._mem) > self.mem_items or self._mem_total > self.mem_bytes:
+            _, (_, _, sz) = self._mem.popitem(last=False)
+            self._mem_total -= sz
+            self.stats["mem_evictions"] += 1
+
+    def _mem_drop(self, key: str) -> None:
+        old = self._mem.pop(key, None)
+        if old:
+            self._mem_total -= old[2]
+
+    # ─────────────  שכבת דיסק  ─────────────
+    def _path(self, key: str) -> Path:
+        return self.dir / f"{key}.json"
+
+    def _disk_index(self) -> "OrderedDict[str, Tuple[float, int]]":
+        # נבנה פעם אחת מתוכן התיקייה (ממוין לפי mtime), ואחר כך מתוחזק בזיכרון
+        if self._disk is None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            entries = []
+            for fp in self.dir.glob("*.json"):
+                try:
+                    st = fp.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, fp.stem, st.st_size))
+            entries.sort()
+            self._disk = OrderedDict((k, (m, sz)) for m, k, sz in entries)
+            self._disk_total = sum(sz for _, _, sz in entries)
+            self._evict_disk()
+        return self._disk
+
+    def _disk_drop(self, key: str) -> None:
+        meta = self._disk_index().pop(key, None)
+        if meta:
+            self._disk_total -= meta[1]
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _adopt(self, key: str) -> Optional[Tuple[float, int]]:
+        # האינדקס נבנה פעם אחת לכל תהליך – קובץ שתהליך אחר כתב מאז נמצא כאן, ב-stat אחד רק כשאין פגיעה
+        try:
+            st = self._path(key).stat()
+        except FileNotFoundError:
+            return None
+        meta = self._disk[key] = (st.st_mtime, st.st_size)
+        self._disk_total += st.st_size
+        return meta
+
+    def _evict_disk(self) -> None:
+        while self._disk and self._disk_total > self.disk_bytes:
+            key = next(iter(self._disk))
+            self._disk_drop(key)
+            self.stats["disk_evictions"] += 1
+
+    def _write_atomic(self, key: str, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+    # ─────────────  API  ─────────────
+    def get(self, key: str) -> Optional[Any]:
+        with CACHE_SECONDS.time(self.name, "get"):
+            return self._get(key)
+
+    def _get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit:
+                if now - hit[0] < self.ttl:
+                    self._mem.move_to_end(key)
+                    self.stats["mem_hits"] += 1
+                    return hit[1]
+                self._mem_drop(key)
+
+            disk = self._disk_index()
+            meta = disk.get(key) or self._adopt(key)
+            if meta is None:
+                self.stats["misses"] += 1
+                return None
+            if now - meta[0] >= self.ttl:
+                self._disk_drop(key)
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            try:
+                raw = self._path(key).read_bytes()
+                value = json.loads(raw)
+            except (OSError, ValueError):
+                self._disk_drop(key)
+                self.stats["misses"] += 1
+                return None
+            disk.move_to_end(key)
+            self._mem_put(key, meta[0], value, len(raw))
+            self.stats["disk_hits"] += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with CACHE_SECONDS.time(self.name, "set"):
+            self._set(key, value)
+
+    def _set(self, key: str, value: Any) -> None:
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        now = time.time()
+        with self._lock:
+            disk = self._disk_index()
+            self._write_atomic(key, data)
+            old = disk.pop(key, None)
+            if old:
+                self._disk_total -= old[1]
+            disk[key] = (now, len(data))
+            self._disk_total += len(data)
+            self._evict_disk()
+            self._mem_put(key, now, value, len(data))
+            self.stats["sets"] += 1
+
+    def info(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, "mem_items": len(self._mem), "mem_bytes": self._mem_total,
+                    "disk_items": len(self._disk or ()), "disk_bytes": self._disk_total}
+
+
+    def hit_ratio(self) -> float:
+        hits = self.stats["mem_hits"] + self.stats["disk_hits"]
+        return hits / (hits + self.stats["misses"]) if hits else 0.0
+
+
+# ─────────────  מדדים (נאספים בזמן ה-scrape מה-stats הקיימים)  ─────────────
+_CACHES: List[TwoTierCache] = []
+
+Observed("edugo_cache_events_total", "Cache hits, misses, writes and evictions.",
+         lambda: {(c.name, k): v for c in _CACHES for k, v in c.stats.items()},
+         ("cache", "event"), kind="counter")
+Observed("edugo_cache_hit_ratio", "Hits / lookups since start.",
+         lambda: {c.name: c.hit_ratio() for c in _CACHES}, ("cache",))
+Observed("edugo_cache_bytes", "Bytes held by each cache tier.",
+         lambda: {(c.name, tier): c.info()[f"{tier}_bytes"] for c in _CACHES for tier in ("mem", "disk")},
+         ("cache", "tier"))
+
+QA_CACHE = TwoTierCache()
@@ -0,0 +1,322 @@
+# bot/dedupe.py  –  בדיקת תקינות ושאלות כמעט-כפולות (shingles + MinHash), למאגר ולסטים שנוצרו ב-GPT
+"""
+check()  – מנרמל שאלה אחת (רווחים, סוג, אות התשובה) או מחזיר את סיבת הפסילה.
+DedupeIndex – אינדקס דמיון: כל שאלה → קבוצת shingles של 4 תווים מהטקסט המנורמל (שאלה + אפשרויות),
+  חתימת MinHash בהצבה אחת (one-permutation: hash אחד לכל shingle, מינימום לכל דלי) ו-LSH ברצועות.
+  רצועה משותפת רק מציעה מועמדים; ההכרעה לפי Jaccard מדויק על ה-shingles, כך שאין false positives.
+clean()  – מעבר אחד על רשימה: פסילת לא-תקינות ואז כמעט-כפולות, לפי הסדר (הראשונה נשארת).
+
+    python -m bot.dedupe                       # אשכולות כפולים במאגר, ב-cache ובסטים של המסמכים
+    python -m bot.dedupe --threshold 0.6 --json report.json
+"""
+import os, re, sys, json, zlib, sqlite3, argparse, unicodedata
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from bot.metrics import Counter
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.7"))   # Jaccard על shingles; מעל זה = אותה שאלה
+SHINGLE   = 4
+BUCKETS   = 32          # אורך חתימת ה-MinHash
+BANDS     = 16          # BUCKETS / BANDS = 2 שורות לרצועה → מועמדים כבר מ-Jaccard ≈ 0.25
+MIN_OPTIONS, MAX_OPTIONS = 2, 5
+LETTERS   = "אבגדה"
+TF_OPTIONS = ("נכון", "לא נכון")
+
+_LETTER = re.compile(r"^([א-ת])\s*[.)]\s*(.*)")
+_WORD   = re.compile(r"\w+")
+_EMPTY  = 0xFFFFFFFF    # דלי בלי shingle
+_ROWS   = BUCKETS // BANDS
+
+DROPPED = Counter("edugo_questions_dropped_total", "Questions dropped at ingest, by source and reason.",
+                  ("source", "reason"))
+
+
+# ─────────────  נרמול ותקינות  ─────────────
+def normalize_text(text: str) -> str:
+    """אותיות קטנות, בלי ניקוד/טעמים ובלי פיסוק – מה שנשאר הוא המילים, ברווח אחד."""
+    text = "".join(ch for ch in unicodedata.normalize("NFKD", str(text)) if not unicodedata.combining(ch))
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _letter(option: str) -> Tuple[Optional[str], str]:
+    m = _LETTER.match(option)
+    return (m.group(1), m.group(2).strip()) if m else (None, option)
+
+
+def check(raw: Any) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    (שאלה מנורמלת, None) או (None, סיבה). הסיבות: structure / type / options / letters / correct.
+    "correct" מנורמל לאות בלבד (ג / ג. / ג. הטקסט המלא / הטקסט בלי האות – כולם → ג).
+    מפתחות נוספים (למשל "id" של המאגר) נשמרים.
+    """
+    if not isinstance(raw, dict) or not all(k in raw for k in ("question", "options", "type", "correct")):
+        return None, "structure"
+    question = str(raw["question"]).strip()
+    options = raw["options"]
+    if not question or not isinstance(options, list) or not all(isinstance(o, str) for o in options):
+        return None, "structure"
+    options = [o.strip() for o in options]
+    qtype = str(raw["type"]).strip().lower()
+    correct = str(raw["correct"]).strip()
+
+    if qtype == "true_false":
+        if tuple(options) != TF_OPTIONS:
+            return None, "options"
+        if correct not in TF_OPTIONS:
+            return None, "correct"
+    elif qtype == "multiple":
+        if not MIN_OPTIONS <= len(options) <= MAX_OPTIONS or not all(options):
+            return None, "options"
+        parsed = [_letter(o) for o in options]
+        letters = [l for l, _ in parsed]
+        if any(letters):
+            # או שכל האפשרויות ממוספרות א., ב., ג. ... ברצף, או שאף אחת לא (ואז האות לפי המקום)
+            if letters != list(LETTERS[:len(options)]):
+                return None, "letters"
+        else:
+            letters = list(LETTERS[:len(options)])
+        label = _letter(correct)[0]
+        if label is None and len(correct) == 1:
+            label = correct
+        if label is None:
+            # התשובה נכתבה כטקסט האפשרות עצמה
+            texts = [t for _, t in parsed]
+            label = letters[texts.index(correct)] if correct in texts else None
+        if label not in letters:
+            return None, "correct"
+        correct = label
+    else:
+        return None, "type"
+
+    return {**raw, "question": question, "type": qtype, "options": options, "correct": correct}, None
+
+
+# ─────────────  אינדקס דמיון  ─────────────
+def shingles(q: Dict) -> FrozenSet[int]:
+    # ב-true_false האפשרויות זהות בכל השאלות – רק מוסיפות רעש לדמיון
+    parts = [q.get("question", "")]
+    if q.get("type") == "multiple":
+        parts += [_letter(o)[1] for o in q.get("options", [])]
+    text = normalize_text(" ".join(parts))
+    if len(text) <= SHINGLE:
+        return frozenset((zlib.crc32(text.encode()),))
+    return frozenset(zlib.crc32(text[i:i + SHINGLE].encode()) for i in range(len(text) - SHINGLE + 1))
+
+
+def _bands(sh: FrozenSet[int]) -> List[Tuple[int, Tuple[int, ...]]]:
+    sig = [_EMPTY] * BUCKETS
+    for h in sh:
+        b, v = h % BUCKETS, h // BUCKETS
+        if v < sig[b]:
+            sig[b] = v
+    out = []
+    for band in range(BANDS):
+        rows = tuple(sig[band * _ROWS:(band + 1) * _ROWS])
+        if any(r != _EMPTY for r in rows):      # רצועה ריקה תאחד כל שתי שאלות קצרות
+            out.append((band, rows))
+    return out
+
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class DedupeIndex:
+    """
+    שאלות שכבר התקבלו; add() מחזיר את המפתח של שאלה דומה מספיק שכבר קיימת (ואז לא מוסיף), או None.
+    זיכרון: קבוצת ה-shingles + BANDS הפניות לכל שאלה. בדיקה: O(shingles) + מספר המועמדים.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._keys: List[Any] = []
+        self._shingles: List[FrozenSet[int]] = []
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def matches(self, q: Dict, sh: Optional[FrozenSet[int]] = None) -> List[Tuple[Any, float]]:
+        """[(מפתח, Jaccard)] של כל השאלות באינדקס שעוברות את הסף, מהדומה ביותר."""
+        sh = shingles(q) if sh is None else sh
+        candidates = {i for band in _bands(sh) for i in self._buckets.get(band, ())}
+        found = [(self._keys[i], jaccard(sh, self._shingles[i])) for i in candidates]
+        return sorted(((k, s) for k, s in found if s >= self.threshold), key=lambda m: -m[1])
+
+    def insert(self, q: Dict, key: Any = None, sh: Optional[FrozenSet[int]] = None) -> None:
+        sh = shingles(q) if sh is None else sh
+        idx = len(self._keys)
+        self._keys.append(q.get("question") if key is None else key)
+        self._shingles.append(sh)
+        for band in _bands(sh):
+            self._buckets[band].append(idx)
+
+    def add(self, q: Dict, key: Any = None) -> Optional[Any]:
+        sh = shingles(q)
+        found = self.matches(q, sh)
+        if found:
+            return found[0][0]
+        self.insert(q, key, sh)
+        return None
+
+    def extend(self, questions: Iterable[Any]) -> None:
+        """מוסיף שאלות שכבר התקבלו (למשל הסט הקיים של מסמך), בלי סינון; פריטים שאינם שאלה – מדלגים."""
+        for q in questions:
+            if isinstance(q, dict) and "question" in q:
+                self.insert(q)
+
+
+def accept(raw: Any, index: DedupeIndex, source: str) -> Optional[Dict]:
+    """שאלה אחת: מנורמלת ונוספה לאינדקס, או None (ונספרת ב-DROPPED)."""
+    q, reason = check(raw)
+    if q is None:
+        DROPPED.inc(source, reason)
+        return None
+    if index.add(q) is not None:
+        DROPPED.inc(source, "duplicate")
+        return None
+    return q
+
+
+def clean(questions: Iterable[Any], index: Optional[DedupeIndex] = None, source: str = "gpt") -> List[Dict]:
+    """פסילת לא-תקינות וכמעט-כפולות (גם מול מה שכבר ב-index) במעבר אחד, לפי הסדר."""
+    index = DedupeIndex() if index is None else index
+    return [q for q in (accept(raw, index, source) for raw in questions) if q is not None]
+
+
+# ─────────────  CLI: דוח על המאגר וה-cache  ─────────────
+def _sources(bank_path: str, cache_dir: Optional[str], sets_db: Optional[str] = None) -> Iterable[Tuple[str, Any]]:
+    try:
+        with open(bank_path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ לא ניתן לקרוא את {bank_path}: {e}", file=sys.stderr)
+        raw = []
+    for i, q in enumerate(raw if isinstance(raw, list) else []):
+        yield f"bank#{i}", q
+    yield from _cached_questions(cache_dir)
+    yield from _set_questions(sets_db)
+
+
+def _cached_questions(cache_dir: Optional[str]) -> Iterable[Tuple[str, Any]]:
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return
+    for name in sorted(os.listdir(cache_dir)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(cache_dir, name), encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            continue
+        # תשובת GPT שמורה כ-{"questions": [...]}, ישנות – רשימה
+        items = value.get("questions") if isinstance(value, dict) else value
+        for i, q in enumerate(items if isinstance(items, list) else []):
+            if isinstance(q, dict) and "question" in q:
+                yield f"{name[:-5]}#{i}", q
+
+
+def _set_questions(sets_db: Optional[str]) -> Iterable[Tuple[str, Any]]:
+    """הסטים הבסיסיים של המסמכים מטבלת sets (bot/quiz.py); סטים אישיים הם הפניות בלבד ומדולגים."""
+    if not sets_db or not os.path.exists(sets_db):
+        return
+    try:
+        db = sqlite3.connect(f"file:{sets_db}?mode=ro", uri=True)
+        try:
+            rows = db.execute("SELECT id, data FROM sets").fetchall()
+        finally:
+            db.close()
+    except sqlite3.Error as e:        # למשל SESSION_STORE=memory – אין טבלת sets
+        print(f"⚠️ לא ניתן לקרוא סטים מ-{sets_db}: {e}", file=sys.stderr)
+        return
+    for set_id, data in rows:
+        try:
+            items = json.loads(data).get("q", [])
+        except (ValueError, AttributeError):
+            continue
+        for i, q in enumerate(items):
+            if isinstance(q, dict) and "question" in q:
+                yield f"{set_id}#{i}", q
+
+
+def _identity(q: Dict) -> Tuple:
+    return q["type"], q["question"], tuple(q["options"]), q["correct"]
+
+
+def report(bank_path: str, cache_dir: Optional[str], threshold: float, sets_db: Optional[str] = None) -> Dict:
+    """
+    אותה שאלה שנוצרה פעם אחת נשמרת ב-cache בכמה עותקים (תשובת המקטע, הסט הממוזג, הסט הבסיסי של
+    המסמך) – עותקים זהים מה-cache מתמזגים לרשומה אחת לפני האשכולות, כדי שהדוח יראה רק כפילויות אמיתיות.
+    במאגר עצמו כל רשומה נספרת, גם זהה.
+    """
+    index = DedupeIndex(threshold)
+    texts: Dict[str, str] = {}
+    invalid: List[Tuple[str, str]] = []
+    parent: Dict[str, str] = {}
+    first: Dict[Tuple, str] = {}          # זהות השאלה → המפתח הראשון שנראה
+    copies = 0
+
+    def root(k: str) -> str:
+        while parent.get(k, k) != k:
+            k = parent[k]
+        return k
+
+    for key, raw in _sources(bank_path, cache_dir, sets_db):
+        q, reason = check(raw)
+        if q is None:
+            invalid.append((key, reason))
+            continue
+        ident = _identity(q)
+        if ident in first and not key.startswith("bank#"):
+            copies += 1
+            continue
+        first.setdefault(ident, key)
+        texts[key] = q["question"]
+        sh = shingles(q)
+        for other, _ in index.matches(q, sh):
+            parent[root(key)] = root(other)
+        index.insert(q, key, sh)
+
+    clusters: Dict[str, List[str]] = defaultdict(list)
+    for key in texts:
+        clusters[root(key)].append(key)
+    dups = sorted((keys for keys in clusters.values() if len(keys) > 1), key=len, reverse=True)
+    return {
+        "questions": len(texts) + len(invalid),
+        "identical_copies": copies,
+        "invalid": invalid,
+        "clusters": [[(k, texts[k]) for k in keys] for keys in dups],
+    }
+
+
+def main(argv=None) -> int:
+    from bot.bank import BANK_PATH
+    from bot.cache import CACHE_DIR
+    from bot.sessions import SESSION_DB
+    p = argparse.ArgumentParser(description="Report invalid and near-duplicate questions")
+    p.add_argument("--bank", default=str(BANK_PATH))
+    p.add_argument("--cache", default=CACHE_DIR, help="QA cache directory (empty string = bank only)")
+    p.add_argument("--sets", default=SESSION_DB, help="SQLite file with the sets table (empty string = skip)")
+    p.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    p.add_argument("--json", help="write the report as JSON to this path")
+    args = p.parse_args(argv)
+
+    rep = report(args.bank, args.cache or None, args.threshold, args.sets or None)
+    print(f"🔎 {rep['questions']} שאלות (+{rep['identical_copies']} עותקים זהים ב-cache ובסטים), "
+          f"{len(rep['invalid'])} לא תקינות, "
+          f"{len(rep['clusters'])} אשכולות כפולים (Jaccard ≥ {args.threshold})")
+    for key, reason in rep["invalid"]:
+        print(f"  ❌ {key}: {reason}")
+    for n, cluster in enumerate(rep["clusters"], 1):
+        print(f"\n#{n} ({len(cluster)})")
+        for key, text in cluster:
+            print(f"  {key:<24} {text[:90]}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rep, f, ensure_ascii=False, indent=2)
+    return 1 if rep["invalid"] or rep["clusters"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
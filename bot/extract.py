@@ -0,0 +1,131 @@
+# bot/extract.py  –  חילוץ טקסט מ-PDF / DOCX / PPTX, עמוד-עמוד, עם עצירה מוקדמת
+# מודול נפרד ורזה: זה מה שתהליכי ה-pool מייבאים, בלי OpenAI ובלי telegram.
+import io, os, asyncio
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+from bot.workers import EXTRACT_WORKERS, run_in_process
+
+MAX_EXTRACT_CHARS = 200000  # כמה טקסט שומרים מהמסמך כולו
+MAX_PAGES_PDF  = 20
+MAX_SLIDES_PPT = 20
+PDF_PARALLEL_MIN_PAGES = 8  # מתחת לזה פיצול בין תהליכים לא משתלם
+
+# נתיב לקובץ, או תוכן הקובץ בזיכרון (bytes / bytearray / memoryview / אובייקט עם read)
+Source = Union[str, Path, bytes, bytearray, memoryview, BinaryIO]
+
+
+def _open(source: Source, suffix: Optional[str]) -> Tuple[Union[Path, BinaryIO], str]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source), (suffix or "").lower()
+    if hasattr(source, "read"):
+        return source, (suffix or Path(getattr(source, "name", "")).suffix).lower()
+    fp = Path(source)
+    return fp, (suffix or fp.suffix).lower()
+
+
+def _picklable(source: Source) -> Source:
+    # memoryview / BytesIO לא עוברים pickle לתהליך אחר – מעבירים bytes
+    if isinstance(source, memoryview):
+        return source.tobytes()
+    if hasattr(source, "getbuffer"):
+        return source.getvalue()
+    return str(source) if isinstance(source, Path) else source
+
+
+def iter_text(source: Source, suffix: Optional[str] = None, start: int = 0, stop: int = None) -> Iterator[str]:
+    """מחזיר את הטקסט של כל עמוד / שקופית / פסקה בנפרד, לפי הסדר; start/stop רלוונטיים ל-PDF."""
+    fp, suf = _open(source, suffix)
+
+    if suf == ".pdf":
+        from pypdf import PdfReader
+        reader = PdfReader(fp)
+        stop = min(MAX_PAGES_PDF, len(reader.pages) if stop is None else stop)
+        for i in range(start, stop):
+            yield reader.pages[i].extract_text() or ""
+
+    elif suf in {".docx", ".doc"}:
+        import docx
+        doc = docx.Document(fp)
+        for p in doc.paragraphs:
+            yield p.text
+
+    elif suf == ".pptx":
+        from pptx import Presentation
+        prs = Presentation(fp)
+        for slide in islice(prs.slides, MAX_SLIDES_PPT):
+            yield "\n".join(
+                shape.text
+                for shape in slide.shapes
+                if hasattr(shape, "text") and isinstance(shape.text, str)
+            )
+
+
+def preload() -> int:
+    """מייבא את ספריות הפענוח בתהליך הנוכחי (ה-warm-up מריץ את זה בכל תהליך של ה-pool); מחזיר את ה-pid."""
+    import pypdf, docx, pptx  # noqa: F401
+    return os.getpid()
+
+
+def _take(parts: Iterator[str], budget: int) -> List[str]:
+    out, size = [], 0
+    for part in parts:
+        out.append(part)
+        size += len(part) + 1
+        if size >= budget:
+            break        # יש מספיק טקסט – לא מפענחים את שאר העמודים
+    return out
+
+
+def extract_text(source: Source, suffix: Optional[str] = None, budget: int = MAX_EXTRACT_CHARS) -> str:
+    try:
+        parts = _take(iter_text(source, suffix), budget)
+    except Exception as e:
+        print("❌ שגיאה בקריאת הקובץ:", e)
+        return ""
+    return "\n".join(parts).strip()[:budget]
+
+
+# ─────────────  PDF גדול: טווחי עמודים בתהליכים נפרדים  ─────────────
+def pdf_page_count(source: Source) -> int:
+    from pypdf import PdfReader
+    return min(MAX_PAGES_PDF, len(PdfReader(_open(source, ".pdf")[0]).pages))
+
+
+def extract_pdf_range(source: Source, start: int, stop: int, budget: int) -> str:
+    try:
+        return "\n".join(_take(iter_text(source, ".pdf", start, stop), budget))
+    except Exception as e:
+        print("❌ שגיאה בקריאת עמודי PDF:", e)
+        return ""
+
+
+async def extract_text_async(source: Source, suffix: Optional[str] = None,
+                             budget: int = MAX_EXTRACT_CHARS) -> str:
+    """
+    מפענח בתהליך נפרד. PDF עם הרבה עמודים מחולק לטווחים, טווח לכל worker,
+    וכל טווח מקבל חלק יחסי מהתקציב כדי לעצור מוקדם גם הוא.
+    """
+    source = _picklable(source)
+    if isinstance(source, (bytes, bytearray)):
+        suffix = (suffix or "").lower()
+    else:
+        suffix = _open(source, suffix)[1]
+    if suffix != ".pdf" or EXTRACT_WORKERS < 2:
+        return await run_in_process(extract_text, source, suffix, budget)
+    try:
+        pages = await run_in_process(pdf_page_count, source)
+    except Exception as e:
+        print("❌ שגיאה בקריאת הקובץ:", e)
+        return ""
+    if pages < PDF_PARALLEL_MIN_PAGES:
+        return await run_in_process(extract_text, source, suffix, budget)
+
+    step = -(-pages // EXTRACT_WORKERS)
+    ranges = [(s, min(s + step, pages)) for s in range(0, pages, step)]
+    per_range = -(-budget // len(ranges))
+    parts = await asyncio.gather(*(
+        run_in_process(extract_pdf_range, source, s, e, per_range) for s, e in ranges
+    ))
+    return "\n".join(parts).strip()[:budget]
@@ -0,0 +1,42 @@
+# bot/file_index.py  –  אינדקס קבצים שכבר עובדו: file_unique_id / sha256 של הבתים → טקסט + מפתח סט השאלות
+import os, hashlib
+from typing import Dict, Optional
+
+from bot.cache import CACHE_DIR, TwoTierCache
+
+FILE_INDEX_DIR   = os.path.join(CACHE_DIR, "files")
+FILE_INDEX_BYTES = int(os.getenv("FILE_INDEX_MB", "50")) * 1024 * 1024
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class FileIndex:
+    """
+    שני סוגי רשומות, שתיהן נשמרות ב-TwoTierCache נפרד (ולכן שורדות restart):
+      fid_<file_unique_id>  → {"sha": ...}
+      sha_<sha256>          → {"text": ..., "qa_key": ...}
+    כך קובץ שטלגרם כבר מכיר לא יורד בכלל, וקובץ זהה שהועלה מחדש (file_unique_id אחר) לא מפוענח שוב.
+    """
+
+    def __init__(self, store: Optional[TwoTierCache] = None):
+        self.store = store or TwoTierCache(FILE_INDEX_DIR, disk_bytes=FILE_INDEX_BYTES, name="files")
+
+    def sha_for(self, file_unique_id: str) -> Optional[str]:
+        hit = self.store.get(f"fid_{file_unique_id}")
+        return hit.get("sha") if hit else None
+
+    def lookup(self, sha: str) -> Optional[Dict]:
+        return self.store.get(f"sha_{sha}")
+
+    def remember(self, file_unique_id: str, sha: str, text: str, qa_key: Optional[str] = None) -> None:
+        entry = self.lookup(sha) or {}
+        if entry.get("text") != text or (qa_key and entry.get("qa_key") != qa_key):
+            entry = {**entry, "text": text, **({"qa_key": qa_key} if qa_key else {})}
+            self.store.set(f"sha_{sha}", entry)
+        if file_unique_id and self.sha_for(file_unique_id) != sha:
+            self.store.set(f"fid_{file_unique_id}", {"sha": sha})
+
+
+FILE_INDEX = FileIndex()
@@ -1,10 +1,8 @@
 
-import os, tempfile, logging
+import asyncio, time
 from pathlib import Path
-from collections import defaultdict
-from datetime import datetime, timedelta
-import re
 import random
+from functools import lru_cache
 from telegram import (
     Update,
     KeyboardButton,
@@ -13,8 +11,8 @@ from telegram import (
     InlineKeyboardMarkup,
     constants,
 )
+from telegram.error import BadRequest
 from telegram.ext import (
-    Application,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
@@ -22,29 +20,48 @@ from telegram.ext import (
     filters,
 )
 
-from bot.qa_generator import build_qa_from_text, extract_text, pick_from_bank, load_bank
+from bot.qa_generator import stream_qa_from_text, qa_cache_key, is_fallback
+from bot.bank import BANK
+from bot.extract import extract_text_async
+from bot.file_index import FILE_INDEX, file_digest
+from bot.sessions import SESSIONS
+from bot.scheduler import SCHEDULER
+from bot.prefetch import PREFETCH
+from bot.jobs import QUEUED_MSG, UPLOADS, Progress
+from bot import metrics
+from bot.metrics import stage
+from bot.quiz import (
+    decode_tap, doc_set_id, encode_tap, is_doc_set, load_set, new_set_id, question_at, save_set,
+)
 
 MAX_FILE_MB     = 5
 ALLOWED_TYPES   = {".pdf", ".docx", ".pptx"}
 DAILY_LIMIT     = 3
 MAX_QUESTIONS   = 6
+STREAM_WAIT_SECS = 60
+EXPIRED_MSG     = "⚠️ הכפתור הזה כבר לא בתוקף. שלח /start כדי להתחיל מחדש."
 
 # מבני נתונים
-_user_usage: dict[int, list[datetime]] = defaultdict(list)
-pending_questions: dict[int, list[dict]] = {}
-pending_correct_answers: dict[int, str] = {}
-last_question_sent: dict[int, dict] = {}
-user_source: dict[int, str] = {}
-user_gpt_qas: dict[int, list[dict]] = {}
+# מצב לכל משתמש (מכסה יומית, הסט האחרון) נמצא ב-SESSIONS – ראו bot/sessions.py.
+# מצב החידון עצמו (סט, מיקום, מקור) נמצא ב-callback_data החתום, בסט האישי שבסשן ובסט הבסיסי המשותף – ראו bot/quiz.py
+_stream_more: dict[str, asyncio.Event] = {}   # set_id → סטים שעדיין מוזרמים מ-GPT בתהליך הזה
 
 def _allowed(user_id: int) -> bool:
-    now = datetime.utcnow()
-    _user_usage[user_id] = [t for t in _user_usage[user_id] if now - t < timedelta(days=1)]
-    if len(_user_usage[user_id]) >= DAILY_LIMIT:
+    now = time.time()
+    sess = SESSIONS.get(user_id)
+    usage = [t for t in sess.get("usage", []) if now - t < 24 * 3600]
+    if len(usage) >= DAILY_LIMIT:
         return False
-    _user_usage[user_id].append(now)
+    sess["usage"] = usage + [now]
+    SESSIONS.put(user_id, sess)
     return True
 
+def _refund(user_id: int) -> None:
+    # הקובץ לא עובד (GPT לא זמין) – לא נספר במכסה
+    sess = SESSIONS.get(user_id)
+    sess["usage"] = sess.get("usage", [])[:-1]
+    SESSIONS.put(user_id, sess)
+
 async def start(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     buttons = [[
         KeyboardButton("🗂️ שאלות מהמַאגר"),
@@ -62,14 +79,11 @@ async def start(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     )
 
 async def menu_choice(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
-    uid = update.effective_user.id
     text = (update.message.text or "").strip()
     if text.startswith("🗂️"):
-        user_source[uid] = "bank"
-        qas = random.sample(load_bank(), k=min(MAX_QUESTIONS, len(load_bank())))
-        await send_questions(update.message, qas)
+        uid = update.effective_user.id
+        await start_set(update.message, uid, _bank_refs(uid), "bank")
     elif text.startswith("📄"):
-        user_source[uid] = "gpt"
         await update.message.reply_text("שלח עכשיו קובץ ואפיק ממנו שאלות.")
     else:
         await update.message.reply_text("לא זיהיתי את הבחירה, נסה שוב /start.")
@@ -78,7 +92,18 @@ async def doc_received(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     doc = update.message.document
     uid = update.effective_user.id
 
+    # בדיקות התור לפני המכסה – קובץ שלא נכנס לתור לא נספר
+    if UPLOADS.busy(uid):
+        metrics.UPLOADS.inc("rejected_busy")
+        await update.message.reply_text("⏳ הקובץ הקודם שלך עדיין בעיבוד – שלח את הבא כשהוא יסתיים.")
+        return
+    if UPLOADS.full():
+        metrics.UPLOADS.inc("rejected_full")
+        await update.message.reply_text("😓 יש כרגע עומס גדול. נסה לשלוח את הקובץ שוב בעוד כמה דקות.")
+        return
+
     if not _allowed(uid):
+        metrics.UPLOADS.inc("quota")
         await update.message.reply_text("הגעת למכסה היומית (3 קבצים). נסה שוב מחר 🙂")
         return
 
@@ -91,159 +116,288 @@ async def doc_received(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("פורמט לא נתמך (PDF / DOCX / PPTX בלבד).")
         return
 
+    # העיבוד עצמו רץ ב-worker של התור; כאן רק הודעת סטטוס אחת שתיערך לאורך הדרך
+    progress = Progress(await update.message.reply_text("📥 הקובץ התקבל…"))
+
+    async def run(progress: Progress):
+        await _process_document(update.message, doc, uid, progress)
+
+    ahead = await UPLOADS.submit(uid, run, progress)
+    if ahead:
+        await progress.set(QUEUED_MSG.format(n=ahead))
+
+async def _process_document(message, doc, uid: int, progress: Progress):
+    t0 = time.perf_counter()
     try:
-        with tempfile.TemporaryDirectory() as tmp:
-            filename = os.path.join(tmp, doc.file_name)
-            file = await doc.get_file()
-            path = await file.download_to_drive(custom_path=filename)
-            text = extract_text(path)
-            if not text.strip():
-                await update.message.reply_text("לא הצלחתי לחלץ טקסט מהקובץ 🤔")
-                return
-
-            user_source[uid] = "gpt"
-            qas_raw = build_qa_from_text(text, 6)
-            qas_all = qas_raw["questions"] if isinstance(qas_raw, dict) else qas_raw
-            user_gpt_qas[uid] = qas_all.copy()
-            qas = random.sample(user_gpt_qas[uid], k=min(MAX_QUESTIONS, len(user_gpt_qas[uid])))
-            await send_questions(update.message, qas)
+        await progress.set("📥 מוריד ומפענח את הקובץ…")
+        sha, entry = await _load_document(doc)
+        text = entry.get("text", "")
+        if not text.strip():
+            metrics.UPLOADS.inc("no_text")
+            FILE_INDEX.remember(doc.file_unique_id, sha, text)
+            await progress.set("לא הצלחתי לחלץ טקסט מהקובץ 🤔")
+            return
+
+        qa_key = qa_cache_key(text, 6)
+        set_id = doc_set_id(qa_key)
+        base = load_set(set_id)
+        # סט שההזרמה שלו נקטעה (complete=False) לא ממוחזר – מייצרים אותו מחדש
+        if base and base["q"] and base.get("complete") and set_id not in _stream_more:
+            # המסמך כבר עובד – סט אישי מתוך הסט הבסיסי, בלי GPT
+            metrics.UPLOADS.inc("reused")
+            FILE_INDEX.remember(doc.file_unique_id, sha, text, qa_key)
+            await progress.set("✅ השאלות מוכנות:")
+            await start_set(message, uid, _next_doc_refs(uid, set_id, base, restart=True), "gpt", set_id)
+            return
+
+        await progress.set("🧠 מכין שאלות מהקובץ…")
+        qs: list[dict] = []
+        fallback: list[dict] = []
+        status: dict = {}
+        more = _stream_more.setdefault(set_id, asyncio.Event())
+        try:
+            # השאלה הראשונה נשלחת ברגע שנסגרה בתשובת GPT, השאר מתווספות לסט תוך כדי
+            async for q in stream_qa_from_text(text, 6, status):
+                if is_fallback(q):      # GPT לא זמין – לא נשמר כסט של המסמך
+                    fallback.append(q)
+                    continue
+                qs.append(q)
+                save_set(set_id, qs, "gpt", set_id, sha=sha, batches=1, streamed=len(qs), complete=False)
+                if len(qs) == 1:
+                    _remember_set(uid, set_id, "gpt", set_id)
+                    await progress.set("✅ השאלות מוכנות:")
+                    await send_single_question(message, set_id, 0)
+                    metrics.STAGE_SECONDS.observe(time.perf_counter() - t0, "upload_first_question")
+                more.set()
+            if qs and not status.get("broken", True):
+                save_set(set_id, qs, "gpt", set_id, sha=sha, batches=1, streamed=len(qs), complete=True)
+        finally:
+            if _stream_more.get(set_id) is more:
+                del _stream_more[set_id]
+            more.set()
+        FILE_INDEX.remember(doc.file_unique_id, sha, text, qa_key)
+        if not qs and fallback:
+            metrics.UPLOADS.inc("fallback")
+            _refund(uid)
+            await progress.set("⚠️ יצירת שאלות מקבצים לא זמינה כרגע (הקובץ לא נספר במכסה). בינתיים – שאלות מהמאגר:")
+            await start_set(message, uid, _as_refs(fallback), "bank")
+            return
+        if not qs:
+            metrics.UPLOADS.inc("no_questions")
+            await progress.set("😢 לא הצלחתי להפיק שאלות.")
+            return
+        metrics.UPLOADS.inc("generated")
+        # הסבב הבא נוצר ברקע בזמן שהמשתמש עונה על הנוכחי; doc_pos מתעדכן שוב בסוף הסט לפי מה שהוגש בפועל
+        _advance_doc(uid, set_id, len(qs), len(qs))
 
     except Exception as e:
+        metrics.UPLOADS.inc("error")
         print("❌ שגיאה בעיבוד הקובץ:", e)
-        await update.message.reply_text("אירעה שגיאה בעיבוד הקובץ 😞")
-
-async def send_questions(message, qas):
-    uid = message.from_user.id
-    if not isinstance(qas, list) or not qas:
+        await progress.set("אירעה שגיאה בעיבוד הקובץ 😞")
+
+async def _load_document(doc) -> tuple[str, dict]:
+    """מחזיר (sha, רשומה עם "text"); מוריד (לזיכרון) ומפענח רק קובץ שעוד לא ראינו."""
+    sha = FILE_INDEX.sha_for(doc.file_unique_id)
+    entry = FILE_INDEX.lookup(sha) if sha else None
+    if entry:
+        return sha, entry
+
+    with stage("download"):
+        file = await doc.get_file()
+        data = await file.download_as_bytearray()     # ≤ MAX_FILE_MB, אין צורך בקובץ זמני
+    sha = file_digest(data)
+    entry = FILE_INDEX.lookup(sha)
+    if entry is None:
+        with stage("extract"):
+            entry = {"text": await extract_text_async(data, Path(doc.file_name).suffix)}
+    return sha, entry
+
+def _next_doc_refs(uid: int, base_id: str, base: dict, restart: bool = False) -> list[dict]:
+    """החלון הבא של שאלות מהסט הבסיסי של המסמך עבור המשתמש; כשאין חדשות – מעורבב מכל הסט."""
+    sess = SESSIONS.get(uid)
+    pos = 0 if restart or sess.get("doc") != base_id else sess.get("doc_pos", 0)
+    total = len(base["q"])
+    if pos < total:
+        end = min(pos + MAX_QUESTIONS, total)
+        refs = [{"s": base_id, "i": i} for i in range(pos, end)]
+    else:
+        end = pos
+        refs = _shuffled_refs(base_id, base)
+    _advance_doc(uid, base_id, end, total)
+    return refs
+
+def _advance_doc(uid: int, base_id: str, doc_pos: int, total: int) -> None:
+    sess = SESSIONS.get(uid)
+    sess.update({"doc": base_id, "doc_pos": doc_pos})
+    SESSIONS.put(uid, sess)
+    if total - doc_pos < MAX_QUESTIONS:
+        PREFETCH.schedule(base_id)
+
+def _bank_refs(uid: int) -> list[dict]:
+    # שאלות שהגיע זמן לחזור עליהן, ואז כאלה שהמשתמש עוד לא ראה – ראו bot/scheduler.py
+    return [{"b": qid} for qid in SCHEDULER.pick(uid, MAX_QUESTIONS)]
+
+def _as_refs(questions: list[dict]) -> list[dict]:
+    # שאלות מהמאגר נשמרות בסט האישי (בסשן) כהפניה בלבד; ה-placeholder אינו במאגר ונשמר כמו שהוא
+    return [{"b": q["id"]} if BANK.get(q["id"]) is not None else q for q in questions]
+
+def _shuffled_refs(base_id: str, base: dict) -> list[dict]:
+    idx = random.sample(range(len(base["q"])), k=min(MAX_QUESTIONS, len(base["q"])))
+    return [{"s": base_id, "i": i} for i in idx]
+
+def new_quiz(uid: int, items: list[dict], src: str, base: str | None = None) -> str | None:
+    if not items:
+        return None
+    set_id = new_set_id()
+    save_set(set_id, items, src, base, uid=uid)
+    _remember_set(uid, set_id, src, base)
+    return set_id
+
+async def start_set(message, uid: int, items: list[dict], src: str, base: str | None = None):
+    # הסט האישי נשמר בסשן של המשתמש (לא של הצ'אט) – handle_answer טוען אותו לפי query.from_user
+    set_id = new_quiz(uid, items, src, base)
+    if set_id is None:
         await message.reply_text("😢 לא הצלחתי להפיק שאלות.")
         return
-    pending_questions[uid] = qas[1:]
-    correct = qas[0].get("correct") or qas[0].get("answer")
-    pending_correct_answers[uid] = str(correct).strip()
-    await send_single_question(message, qas[0])
-
-async def send_single_question(message, q):
-    uid = message.from_user.id
-    correct = q.get("correct") or q.get("answer")
-    pending_correct_answers[uid] = str(correct).strip()
-    last_question_sent[uid] = q
-
-    buttons = []
-    qtype = q.get("type", "").lower()
-
-    # Prepare message text with full options (e.g., "א. ...")
-    message_text = f"{q['question'].strip()}\n\n"
-    letter_options = []  # Used for buttons
-
-    for idx, opt in enumerate(q["options"]):
-        opt = opt.strip()
-        if qtype == "multiple":
-            # Match "א. ..." format
-            match = re.match(r"^([א-ת])\.\s*(.+)", opt)
-            if match:
-                letter = match.group(1).strip()
-                full_option = opt
-            else:
-                letter = chr(ord("א") + idx)
-                full_option = f"{letter}. {opt}"
-        else:
-            letter = opt  # For true/false
-            full_option = opt
+    await send_single_question(message, set_id, 0, uid)
+
+def _remember_set(uid: int, set_id: str, src: str, base: str | None) -> None:
+    sess = SESSIONS.get(uid)
+    sess.update({"set": set_id, "src": src, "doc": base if src == "gpt" else sess.get("doc")})
+    SESSIONS.put(uid, sess)
+
+def render_question(set_id: str, pos: int, quiz: dict | None = None,
+                    uid: int | None = None) -> tuple[str, InlineKeyboardMarkup] | None:
+    qq = question_at(quiz if quiz is not None else load_set(set_id, uid), set_id, pos)
+    if qq is None:
+        return None
+    return qq.text, _keyboard(set_id, pos, qq.labels)
+
+@lru_cache(maxsize=4096)
+def _keyboard(set_id: str, pos: int, labels: tuple[str, ...]) -> InlineKeyboardMarkup:
+    # אותו (סט, מיקום, תוויות) → אותה מקלדת; InlineKeyboardMarkup הוא immutable ב-PTB
+    buttons = [
+        InlineKeyboardButton(text=letter, callback_data=encode_tap("a", set_id, pos, str(idx)))
+        for idx, letter in enumerate(labels)
+    ]
+    # Add skip button
+    buttons.append(InlineKeyboardButton("⏭️ דלג", callback_data=encode_tap("a", set_id, pos, "s")))
+    return InlineKeyboardMarkup([[b] for b in buttons])
 
-        message_text += f"{full_option}\n"
-        buttons.append(InlineKeyboardButton(text=letter, callback_data=letter))
+async def send_single_question(message, set_id: str, pos: int, uid: int | None = None):
+    view = render_question(set_id, pos, uid=uid)
+    if view is None:
+        await message.reply_text("⚠️ לא נמצאו שאלות תקינות במקור.")
+        return
+    text, markup = view
+    await message.reply_text(text, parse_mode=constants.ParseMode.HTML, reply_markup=markup)
 
-    # Add skip button
-    buttons.append(InlineKeyboardButton("⏭️ דלג", callback_data="skip"))
+async def _edit(query, text: str, markup: InlineKeyboardMarkup | None = None):
+    """התשובה ללחיצה נכתבת לתוך ההודעה שנלחצה – בקשה אחת במקום הסרת מקלדת + פסק דין + שאלה."""
+    try:
+        await query.edit_message_text(text, parse_mode=constants.ParseMode.HTML, reply_markup=markup)
+    except BadRequest as e:
+        if "not modified" in str(e).lower():
+            return              # לחיצה כפולה – ההודעה כבר מציגה בדיוק את זה, לא שולחים שאלה כפולה
+        print("⚠️ עריכת ההודעה נכשלה, שולח חדשה:", e)
+        await query.message.reply_text(text, parse_mode=constants.ParseMode.HTML, reply_markup=markup)
 
-    await message.reply_text(
-        message_text.strip(),
-        parse_mode=constants.ParseMode.HTML,
-        reply_markup=InlineKeyboardMarkup([[b] for b in buttons]),
-    )
 async def handle_answer(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    with stage("answer"):
+        await _handle_answer(update)
+
+async def _handle_answer(update: Update):
     query = update.callback_query
-    uid = query.from_user.id
     await query.answer()
-    await query.edit_message_reply_markup(reply_markup=None)
 
-    user_answer = query.data.strip()
-    current_q = last_question_sent.get(uid)
-    correct = (current_q.get("correct") or current_q.get("answer") or "").strip()
-    qtype = current_q.get("type", "").lower() if current_q else ""
+    tap = decode_tap((query.data or "").strip())
+    if tap is None:
+        metrics.ANSWERS.inc("expired")
+        await _edit(query, EXPIRED_MSG)
+        return
 
     # המשך
-    if user_answer == "continue_yes":
-        source = user_source.get(uid, "bank")
-
-        if source == "gpt" and uid in user_gpt_qas:
-            qas_pool = user_gpt_qas[uid]
-            if not qas_pool:
-                await query.message.reply_text("🎉 אין עוד שאלות מהקובץ שהעלית.")
-                return
-            qas = random.sample(qas_pool, k=min(MAX_QUESTIONS, len(qas_pool)))
+    if tap.kind == "c":
+        if tap.choice == "y":
+            await _edit(query, *_continue(query.from_user.id, tap.set_id))
         else:
-            qas = random.sample(load_bank(), k=min(MAX_QUESTIONS, len(load_bank())))
-
-        qas = [q for q in qas if "question" in q and "options" in q and isinstance(q["options"], list)]
-
-        if not qas:
-            await query.message.reply_text("⚠️ לא נמצאו שאלות תקינות במקור.")
-            return
-
-        pending_questions[uid] = qas[1:]
-        last_question_sent[uid] = qas[0]
-        await send_single_question(query.message, qas[0])
+            await _edit(query, "תודה! נתראה בפעם הבאה 👋")
         return
 
-    if user_answer == "continue_no":
-        await query.message.reply_text("תודה! נתראה בפעם הבאה 👋")
+    uid = query.from_user.id
+    quiz = load_set(tap.set_id, uid)
+    current_q = question_at(quiz, tap.set_id, tap.pos)
+    if current_q is None:
+        metrics.ANSWERS.inc("expired")
+        await _edit(query, EXPIRED_MSG)
         return
 
     # תשובה רגילה
-    if user_answer == "skip":
-        await query.message.reply_text("⬇️ דילגת על השאלה.")
-    elif correct:
-        # שלוף את התשובה המלאה מתוך האפשרויות
-        full_answer = correct
-        if current_q and "options" in current_q:
-            for opt in current_q["options"]:
-                opt = opt.strip()
-                if qtype == "multiple":
-                    match = re.match(r"^([א-ת])\.\s*(.+)", opt)
-                    if match and match.group(1).strip() == correct:
-                        full_answer = opt
-                        break
-                else:
-                    if opt.strip().lower() == correct.lower():
-                        full_answer = opt
-                        break
-
-        if user_answer == correct:
-            await query.message.reply_text("✅ תשובה נכונה!")
+    if tap.choice == "s":
+        result, verdict = "skipped", "⬇️ דילגת על השאלה."
+    elif current_q.correct and tap.choice.isdigit() and int(tap.choice) < len(current_q.labels):
+        if current_q.is_correct(int(tap.choice)):
+            result, verdict = "correct", "✅ תשובה נכונה!"
         else:
-            await query.message.reply_text(f"❌ תשובה שגויה.\nהתשובה הנכונה היא: {full_answer}")
+            result, verdict = "wrong", f"❌ תשובה שגויה.\nהתשובה הנכונה היא: {current_q.full_answer}"
     else:
-        await query.message.reply_text("⚠️ לא הצלחתי לבדוק אם התשובה נכונה.")
-
-    # שלח שאלה הבאה אם קיימת
-    if pending_questions.get(uid):
-        while pending_questions[uid]:
-            next_q = pending_questions[uid].pop(0)
-            if "question" in next_q and "options" in next_q:
-                last_question_sent[uid] = next_q
-                await send_single_question(query.message, next_q)
-                return
+        result, verdict = "ungraded", "⚠️ לא הצלחתי לבדוק אם התשובה נכונה."
+    metrics.ANSWERS.inc(result)
+    item = quiz["q"][tap.pos]
+    if "b" in item and result != "ungraded":
+        SCHEDULER.record(uid, item["b"], result)
+
+    # אם הסט עדיין מוזרם מ-GPT – מחכים לשאלה הבאה במקום לסיים
+    next_pos = tap.pos + 1
+    more = _stream_more.get(tap.set_id)
+    while more and _served_len(tap.set_id, quiz) <= next_pos:
+        more.clear()
+        try:
+            await asyncio.wait_for(more.wait(), timeout=STREAM_WAIT_SECS)
+        except asyncio.TimeoutError:
+            break
+        quiz = load_set(tap.set_id, uid) or quiz
+        more = _stream_more.get(tap.set_id)
+
+    # שאלה הבאה אם קיימת – באותה הודעה יחד עם פסק הדין
+    view = render_question(tap.set_id, next_pos, quiz) if next_pos < _served_len(tap.set_id, quiz) else None
+    if view is not None:
+        text, markup = view
+        await _edit(query, f"{verdict}\n\n{text}", markup)
+        return
 
     # סיום סט
-    await query.message.reply_text(
-        "🎉 סיימת את כל השאלות! רוצה להמשיך עם סט חדש?",
-        reply_markup=InlineKeyboardMarkup([
-            [InlineKeyboardButton("✅ כן", callback_data="continue_yes"),
-             InlineKeyboardButton("❌ לא", callback_data="continue_no")]
-        ])
+    if is_doc_set(tap.set_id):
+        # המעלה ענה ישירות על הסט הבסיסי – "המשך" מתחיל אחרי מה שהוגש לו בפועל
+        _advance_doc(uid, tap.set_id, next_pos, len(quiz["q"]))
+    await _edit(
+        query,
+        f"{verdict}\n\n🎉 סיימת את כל השאלות! רוצה להמשיך עם סט חדש?",
+        InlineKeyboardMarkup([
+            [InlineKeyboardButton("✅ כן", callback_data=encode_tap("c", tap.set_id, 0, "y")),
+             InlineKeyboardButton("❌ לא", callback_data=encode_tap("c", tap.set_id, 0, "n"))]
+        ]),
     )
 
+def _served_len(set_id: str, quiz: dict) -> int:
+    # מי שהעלה את המסמך עונה על הסבב המוזרם בלבד; מה שה-prefetch הוסיף לסט הבסיסי מוגש דרך "המשך"
+    return quiz.get("streamed", len(quiz["q"])) if is_doc_set(set_id) else len(quiz["q"])
+
+def _continue(uid: int, set_id: str) -> tuple[str, InlineKeyboardMarkup | None]:
+    """סט חדש מאותו מקור; מחזיר את השאלה הראשונה שלו (טקסט + מקלדת) לעריכה במקום."""
+    quiz = load_set(set_id, uid)
+    if quiz and quiz["src"] == "gpt":
+        base_id = quiz.get("base") or set_id
+        base = load_set(base_id)
+        if not base or not base["q"]:
+            return "🎉 אין עוד שאלות מהקובץ שהעלית.", None
+        new_id = new_quiz(uid, _next_doc_refs(uid, base_id, base), "gpt", base_id)
+    else:
+        new_id = new_quiz(uid, _bank_refs(uid), "bank")
+
+    view = render_question(new_id, 0, uid=uid) if new_id else None
+    return view or ("⚠️ לא נמצאו שאלות תקינות במקור.", None)
+
 
 def register_handlers(app):
     app.add_handler(CommandHandler("start", start))
@@ -0,0 +1,141 @@
+# bot/jobs.py  –  תור עבודות להעלאות: מספר workers קבוע, תור חסום, ועבודה אחת לכל משתמש בכל רגע
+import os, time, asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Set
+
+from telegram.error import TelegramError
+
+from bot.metrics import STAGE_SECONDS, Observed
+
+UPLOAD_WORKERS   = int(os.getenv("UPLOAD_WORKERS", "2"))
+UPLOAD_QUEUE_MAX = int(os.getenv("UPLOAD_QUEUE_MAX", "20"))     # עבודות שממתינות (לא כולל אלה שרצות)
+QUEUED_MSG       = "⏳ יש עומס כרגע – אתה מספר {n} בתור. ההודעה תתעדכן כשהקובץ ייכנס לעיבוד."
+
+
+class Progress:
+    """הודעת סטטוס אחת שנערכת במקום לאורך חיי העבודה; טקסט זהה לקודם לא נשלח שוב."""
+
+    def __init__(self, message):
+        self.message = message
+        self.text = message.text
+
+    async def set(self, text: str) -> None:
+        if text == self.text:
+            return
+        self.text = text
+        try:
+            await self.message.edit_text(text)
+        except TelegramError as e:
+            # BadRequest / Forbidden (המשתמש חסם) / TimedOut / RetryAfter – הסטטוס לא קריטי, העבודה ממשיכה
+            print("⚠️ עדכון הודעת הסטטוס נכשל:", e)
+
+
+Run = Callable[[Progress], Awaitable[None]]
+
+
+class UploadJob:
+    __slots__ = ("uid", "run", "progress", "started", "enqueued")
+
+    def __init__(self, uid: int, run: Run, progress: Progress):
+        self.uid = uid
+        self.run = run
+        self.progress = progress
+        self.started = False
+        self.enqueued = time.perf_counter()
+
+    async def queued_at(self, n: int) -> None:
+        # ה-edit רץ כמשימה נפרדת – ייתכן שבינתיים העבודה כבר התחילה ועדכנה את הסטטוס בעצמה
+        if not self.started:
+            await self.progress.set(QUEUED_MSG.format(n=n))
+
+
+class UploadQueue:
+    """
+    FIFO של עבודות, workers קבועים שמושכים ממנו.
+    הוגנות: למשתמש יש לכל היותר עבודה אחת שממתינה או רצה, כך שאף משתמש לא תופס את כל התור.
+    כשהתור מלא (max_waiting) – לא מקבלים עבודה חדשה; ה-handler בודק full() לפני שהוא מוריד מכסה.
+    """
+
+    def __init__(self, workers: int = UPLOAD_WORKERS, max_waiting: int = UPLOAD_QUEUE_MAX):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self._waiting: Deque[UploadJob] = deque()
+        self._users: Set[int] = set()
+        self._cond = asyncio.Condition()
+        self._tasks: List[asyncio.Task] = []
+        self._announcing: Set[asyncio.Future] = set()
+        self._active = 0          # עבודות שהתקבלו ועוד לא הסתיימו (ממתינות + רצות)
+        self.stats = {"done": 0, "failed": 0, "queued": 0}
+
+    def busy(self, uid: int) -> bool:
+        return uid in self._users
+
+    @property
+    def running(self) -> int:
+        return self._active - len(self._waiting)
+
+    def full(self) -> bool:
+        return self._active >= self.workers + self.max_waiting
+
+    def _ahead(self, idx: int) -> int:
+        # כמה עבודות צריכות להסתיים לפני שהעבודה במקום idx תתחיל (0 = יש worker פנוי)
+        return max(0, idx + 1 + self.running - self.workers)
+
+    async def submit(self, uid: int, run: Run, progress: Progress) -> int:
+        """מכניס עבודה לתור ומחזיר את מקומה בתור (0 אם תתחיל מיד)."""
+        if not self._tasks:
+            self._tasks = [asyncio.get_running_loop().create_task(self._worker()) for _ in range(self.workers)]
+        self._users.add(uid)
+        self._active += 1
+        async with self._cond:
+            self._waiting.append(UploadJob(uid, run, progress))
+            self._cond.notify()
+            ahead = self._ahead(len(self._waiting) - 1)
+        if ahead:
+            self.stats["queued"] += 1
+        return ahead
+
+    def _announce(self) -> None:
+        # מי שממתין רואה את המקום המעודכן שלו בתור. משימה נפרדת: העבודה שמתחילה לא מחכה ל-edits
+        # (שעוברים במגביל של טלגרם), ושגיאה בהודעה של משתמש אחר לא נוגעת בה
+        jobs = [(job, self._ahead(i)) for i, job in enumerate(self._waiting)]
+        coros = [job.queued_at(n) for job, n in jobs if n]
+        if not coros:
+            return
+        task = asyncio.gather(*coros, return_exceptions=True)
+        self._announcing.add(task)
+        task.add_done_callback(self._announcing.discard)
+
+    async def _worker(self) -> None:
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: self._waiting)
+                job = self._waiting.popleft()
+                job.started = True
+            STAGE_SECONDS.observe(time.perf_counter() - job.enqueued, "upload_queue_wait")
+            self._announce()
+            try:
+                with STAGE_SECONDS.time("upload_total"):
+                    await job.run(job.progress)
+                self.stats["done"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                print("❌ שגיאה בעבודת העלאה:", e)
+            finally:
+                self._active -= 1
+                self._users.discard(job.uid)
+
+    async def close(self) -> None:
+        tasks = self._tasks + list(self._announcing)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+
+
+UPLOADS = UploadQueue()
+
+Observed("edugo_upload_jobs", "Upload jobs waiting in the queue / being processed.",
+         lambda: {"waiting": len(UPLOADS._waiting), "running": UPLOADS.running}, ("state",))
+Observed("edugo_upload_jobs_total", "Upload jobs finished, failed, or that had to wait.",
+         lambda: UPLOADS.stats, ("result",), kind="counter")
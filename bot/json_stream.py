@@ -0,0 +1,63 @@
+# bot/json_stream.py  –  פענוח הדרגתי של מערך JSON שמגיע בחתיכות (stream מ-GPT)
+import json
+from typing import Any, List
+
+
+class JSONArrayStream:
+    """
+    feed(chunk) מחזיר את כל האובייקטים ברמה העליונה של המערך שנסגרו בחתיכה הזו.
+    מתעלם מטקסט לפני ה-'[' של המערך (למשל ```json, או "[6] שאלות:" – סוגריים שנסגרו בלי אובייקט
+    בתוכם לא נחשבים המערך) ומכל מה שאחרי ה-']' הסוגר.
+    כל תו נסרק פעם אחת בלבד; רק האובייקט הפתוח הנוכחי נשמר בזיכרון.
+    """
+
+    def __init__(self):
+        self._buf = ""          # מתחיל ב-'{' של האובייקט הפתוח (או ריק)
+        self._depth = 0         # 0 = לפני המערך, 1 = בתוך המערך, 2+ = בתוך אובייקט
+        self._in_str = False
+        self._escape = False
+        self._objects = 0       # כמה אובייקטים נפתחו בסוגריים הנוכחיים
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        out: List[Any] = []
+        for ch in chunk:
+            if self.done:
+                break
+            if self._depth >= 2:
+                self._buf += ch
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+                continue
+
+            if ch == '"':
+                if self._depth >= 1:
+                    self._in_str = True
+            elif ch in "{[":
+                if self._depth == 0 and ch == "[":
+                    self._depth = 1
+                    self._objects = 0
+                elif self._depth == 1 and ch == "{":
+                    self._buf = ch
+                    self._depth = 2
+                    self._objects += 1
+                elif self._depth >= 2:
+                    self._depth += 1
+            elif ch in "}]":
+                if self._depth == 1 and ch == "]":
+                    self._depth = 0
+                    self.done = self._objects > 0
+                elif self._depth >= 2:
+                    self._depth -= 1
+                    if self._depth == 1:
+                        try:
+                            out.append(json.loads(self._buf))
+                        except ValueError:
+                            pass      # אובייקט פגום – מדלגים עליו וממשיכים לבא
+                        self._buf = ""
+        return out
@@ -37,21 +37,78 @@
 #         )
 #     return builder
 
-# bot/keep_alive.py
-from flask import Flask
-import threading
+# bot/keep_alive.py  –  שרת HTTP על אותו event loop של הבוט: ping, בריאות ומוכנות (וה-webhook ב-app.py)
+import os, hmac, asyncio
+from aiohttp import web
+from telegram.ext import Application
 
-app = Flask(__name__)
+from bot import metrics
+from bot.profiler import PROFILER, sample_for
 
-@app.route('/')
-def home():
-    return "I'm alive!"
+PORT = int(os.getenv("PORT", "8080"))
+METRICS_TOKEN    = os.getenv("METRICS_TOKEN", "")          # אם מוגדר – /metrics ו-/debug/* דורשים Bearer
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "") == "1"
 
-def run():
-    app.run(host='0.0.0.0', port=8080)
 
-def launch_keep_alive():
-    t = threading.Thread(target=run)
-    t.start()
+async def home(request: web.Request) -> web.Response:
+    return web.Response(text="I'm alive!")
 
 
+async def healthz(request: web.Request) -> web.Response:
+    return web.json_response({"ok": True})
+
+
+async def readyz(request: web.Request) -> web.Response:
+    # מוכן רק כשה-dispatcher של PTB רץ ויכול לקבל עדכונים
+    ready = request.app["ptb"].running
+    return web.json_response({"ready": ready}, status=200 if ready else 503)
+
+
+def _authorized(request: web.Request) -> bool:
+    if not METRICS_TOKEN:
+        return True
+    return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}")
+
+
+async def metrics_view(request: web.Request) -> web.Response:
+    if not _authorized(request):
+        return web.Response(status=401)
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def profile_view(request: web.Request) -> web.Response:
+    # GET /debug/profile?seconds=10 → stacks בפורמט collapsed (flamegraph)
+    if not _authorized(request):
+        return web.Response(status=401)
+    if PROFILER.running:
+        return web.Response(status=409, text="profiler already running\n")
+    try:
+        seconds = sample_for(request.query.get("seconds", "10"))
+    except ValueError:
+        return web.Response(status=400)
+    PROFILER.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        out = PROFILER.stop()
+    return web.Response(text=out)
+
+
+def make_web_app(application: Application) -> web.Application:
+    app = web.Application()
+    app["ptb"] = application
+    app.router.add_get("/", home)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/readyz", readyz)
+    app.router.add_get("/metrics", metrics_view)
+    if PROFILER_ENABLED:
+        app.router.add_get("/debug/profile", profile_view)
+    return app
+
+
+async def start_server(app: web.Application, port: int = PORT) -> web.AppRunner:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", port).start()
+    return runner
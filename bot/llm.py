@@ -0,0 +1,144 @@
+# bot/llm.py  –  קריאות ל-OpenAI: deadline לכל ניסיון ולכל הקריאה, ניסיונות חוזרים עם jitter, circuit breaker
+import os, time, random, asyncio
+from typing import Any, Optional
+
+from bot.metrics import LLM_REQUESTS, STAGE_SECONDS, Observed, record_usage
+
+LLM_TIMEOUT_SECS   = float(os.getenv("LLM_TIMEOUT_SECS", "25"))     # ניסיון בודד (עד תחילת התשובה בהזרמה)
+LLM_DEADLINE_SECS  = float(os.getenv("LLM_DEADLINE_SECS", "45"))    # כל הקריאה, כולל ניסיונות חוזרים / הזרמה
+LLM_RETRIES        = int(os.getenv("LLM_RETRIES", "2"))
+BREAKER_FAILURES   = int(os.getenv("LLM_BREAKER_FAILURES", "5"))    # כשלונות רצופים עד שהמפסק נפתח
+BREAKER_RESET_SECS = float(os.getenv("LLM_BREAKER_RESET_SECS", "60"))
+_BACKOFF_BASE, _BACKOFF_CAP = 0.5, 8.0
+
+# ה-SDK של openai הוא רוב זמן ה-import של הבוט (~0.7s), ולכן הוא נטען רק ב-get_client():
+# בקריאה הראשונה ל-GPT, או מוקדם יותר ב-warm-up שרץ אחרי שהבוט כבר מקבל עדכונים (bot/warmup.py)
+HAS_OPENAI = bool(os.getenv("OPENAI_API_KEY"))      # מתעדכן ל-False אם יצירת ה-client נכשלת
+_client = None
+
+
+def get_client():
+    global _client, HAS_OPENAI
+    if _client is None and HAS_OPENAI:
+        try:
+            from openai import AsyncOpenAI
+            # הניסיונות החוזרים מנוהלים כאן, לא בתוך ה-SDK
+            _client = AsyncOpenAI(max_retries=0, timeout=LLM_TIMEOUT_SECS)
+        except Exception as e:
+            print("⚠️ שגיאה בהתחברות ל־OpenAI:", e)
+            HAS_OPENAI = False
+    return _client
+
+
+def api_error() -> type:
+    """openai.APIError – לשימוש ב-except אחרי שה-client כבר נוצר (ה-import כבר שמור ב-sys.modules)."""
+    import openai
+    return openai.APIError
+
+
+class LLMUnavailable(Exception):
+    """אין תשובה שמישה מ-GPT (מפסק פתוח / נגמרו הניסיונות / פלט שבור). תוצאה כזו לא נשמרת ב-cache."""
+
+
+class CircuitBreaker:
+    """
+    closed → open אחרי `failures` כשלונות רצופים; בזמן open כל קריאה נכשלת מיד (בלי להמתין ל-timeout).
+    אחרי reset_secs קריאה אחת עוברת כבדיקה (half-open): הצלחה סוגרת, כשלון פותח מחדש.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_secs: float = BREAKER_RESET_SECS):
+        self.failures = failures
+        self.reset_secs = reset_secs
+        self._fails = 0
+        self._opened_at: Optional[float] = None
+        self._probe_until = 0.0
+        self.stats = {"opened": 0, "short_circuited": 0}
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self._opened_at < self.reset_secs else "half-open"
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        now = time.monotonic()
+        # בדיקה אחת בכל פעם; בדיקה שבוטלה באמצע משתחררת אחרי ה-deadline
+        if now - self._opened_at >= self.reset_secs and now >= self._probe_until:
+            self._probe_until = now + LLM_DEADLINE_SECS
+            return True
+        self.stats["short_circuited"] += 1
+        LLM_REQUESTS.inc("short_circuited")
+        return False
+
+    def success(self) -> None:
+        self._fails = 0
+        self._opened_at = None
+        self._probe_until = 0.0
+
+    def failure(self) -> None:
+        self._fails += 1
+        if self._opened_at is not None or self._fails >= self.failures:
+            if self._opened_at is None:
+                self.stats["opened"] += 1
+                print("⚠️ GPT לא זמין – עוברים לשאלות מהמאגר")
+            self._opened_at = time.monotonic()
+            self._probe_until = 0.0
+
+
+BREAKER = CircuitBreaker()
+
+Observed("edugo_llm_breaker_open", "1 while the OpenAI circuit breaker is open.",
+         lambda: 1 if BREAKER.state == "open" else 0)
+
+
+def available() -> bool:
+    return HAS_OPENAI and BREAKER.state != "open"
+
+
+def remaining(deadline: float) -> float:
+    return deadline - time.monotonic()
+
+
+async def complete(deadline: Optional[float] = None, **kwargs) -> Any:
+    """
+    chat.completions.create עם deadline וניסיונות חוזרים (full jitter).
+    עם stream=True מחזיר את ה-stream אחרי שהתשובה התחילה; הקורא צורך אותו עד `deadline`
+    ומדווח ל-BREAKER בעצמו – success רק כשה-stream הסתיים, failure כשנקטע באמצע.
+    """
+    client = get_client()
+    if client is None or not BREAKER.allow():
+        raise LLMUnavailable("circuit open" if client is not None else "OpenAI not configured")
+    import openai
+    # שגיאות זמניות – שווה לנסות שוב
+    retryable = (asyncio.TimeoutError, openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+    # שגיאות של הבקשה עצמה (למשל טקסט ארוך מדי) – לא אומרות שה-API למטה
+    request_errors = (openai.BadRequestError, openai.UnprocessableEntityError)
+    deadline = deadline or time.monotonic() + LLM_DEADLINE_SECS
+    for attempt in range(LLM_RETRIES + 1):
+        budget = min(LLM_TIMEOUT_SECS, remaining(deadline))
+        try:
+            with STAGE_SECONDS.time("llm_request"):
+                rsp = await asyncio.wait_for(client.chat.completions.create(timeout=budget, **kwargs), budget)
+            if not kwargs.get("stream"):
+                BREAKER.success()       # headers של stream עוד לא אומרים שהתשובה תגיע
+            LLM_REQUESTS.inc("ok")
+            record_usage(getattr(rsp, "usage", None))     # בהזרמה usage מגיע ב-chunk האחרון
+            return rsp
+        except request_errors as e:
+            LLM_REQUESTS.inc("rejected")
+            raise LLMUnavailable(f"request rejected: {e}") from e
+        except retryable as e:
+            LLM_REQUESTS.inc("timeout" if isinstance(e, (asyncio.TimeoutError, openai.APITimeoutError)) else "error")
+            delay = random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt))
+            if attempt >= LLM_RETRIES or remaining(deadline) <= delay + 1:
+                BREAKER.failure()
+                raise LLMUnavailable(f"{type(e).__name__} after {attempt + 1} attempts") from e
+            print(f"⚠️ GPT נכשל ({type(e).__name__}), ניסיון חוזר בעוד {delay:.1f}s")
+            await asyncio.sleep(delay)
+        except openai.APIError as e:
+            # הרשאות / מודל / חשבון – לא יסתדר בניסיון חוזר
+            LLM_REQUESTS.inc("error")
+            BREAKER.failure()
+            raise LLMUnavailable(str(e)) from e
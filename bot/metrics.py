@@ -0,0 +1,155 @@
+# bot/metrics.py  –  מונים והיסטוגרמות בזיכרון התהליך, מוצגים בפורמט הטקסט של Prometheus (/metrics)
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple, Union
+
+# שניות; מ-cache בזיכרון (מילישניות) ועד יצירה מלאה מקובץ (עשרות שניות)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+LabelValues = Tuple[str, ...]
+REGISTRY: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        REGISTRY.append(self)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterator[str]:
+        return iter(())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, doc, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *values: str, amount: float = 1) -> None:
+        self._values[values] = self._values.get(values, 0) + amount
+
+    def _samples(self) -> Iterator[str]:
+        for values, v in list(self._values.items()):
+            yield f"{self.name}{_labels(self.labels, values)} {_num(v)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[LabelValues, list] = {}     # values → [מונה לכל דלי..., +Inf, sum]
+
+    def observe(self, seconds: float, *values: str) -> None:
+        series = self._series.get(values)
+        if series is None:
+            series = self._series[values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, seconds)] += 1
+        series[-1] += seconds
+
+    @contextmanager
+    def time(self, *values: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, *values)
+
+    def _samples(self) -> Iterator[str]:
+        for values, series in list(self._series.items()):
+            total = 0
+            for bound, n in zip(self.buckets + (float("inf"),), series):
+                total += n
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else _num(bound))
+                yield f"{self.name}_bucket{_labels(self.labels, values, le)} {total}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {_num(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {total}"
+
+
+class Observed(_Metric):
+    """
+    ערך שנקרא בזמן ה-scrape מתוך מבנה שכבר סופר בעצמו (stats של cache, אורך תור),
+    כדי לא לשכפל מונים. fn מחזירה מספר, או dict של ערכי labels (מחרוזת / tuple) → מספר.
+    """
+
+    def __init__(self, name: str, doc: str, fn: Callable[[], Union[float, Dict[Any, float]]],
+                 labels: Tuple[str, ...] = (), kind: str = "gauge"):
+        super().__init__(name, doc, labels)
+        self.fn = fn
+        self.kind = kind
+
+    def _samples(self) -> Iterator[str]:
+        try:
+            value = self.fn()
+        except Exception as e:
+            print("⚠️ שגיאה באיסוף מדד:", self.name, e)
+            return
+        if isinstance(value, dict):
+            for key, v in value.items():
+                values = key if isinstance(key, tuple) else (key,)
+                yield f"{self.name}{_labels(self.labels, values)} {_num(v)}"
+        else:
+            yield f"{self.name} {_num(value)}"
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# ─────────────  המדדים של הבוט  ─────────────
+STAGE_SECONDS = Histogram(
+    "edugo_stage_seconds", "Latency of each processing stage.", ("stage",))
+UPLOADS = Counter(
+    "edugo_uploads_total", "Uploaded files by outcome.", ("result",))
+ANSWERS = Counter(
+    "edugo_answers_total", "Quiz taps by outcome.", ("result",))
+LLM_REQUESTS = Counter(
+    "edugo_llm_requests_total", "OpenAI attempts by outcome.", ("outcome",))
+LLM_TOKENS = Counter(
+    "edugo_llm_tokens_total", "OpenAI tokens used.", ("kind",))
+TG_SECONDS = Histogram(
+    "edugo_telegram_request_seconds", "Bot API call latency (after throttling).", ("endpoint",))
+TG_THROTTLE_SECONDS = Histogram(
+    "edugo_telegram_throttle_seconds", "Time spent waiting for the outbound rate limiter.")
+CACHE_SECONDS = Histogram(
+    "edugo_cache_seconds", "Cache get/set latency.", ("cache", "op"))
+
+
+def stage(name: str):
+    """with stage("extract"): ...  – זמן השלב נכנס ל-edugo_stage_seconds."""
+    return STAGE_SECONDS.time(name)
+
+
+def record_usage(usage) -> None:
+    # usage של OpenAI (גם בתשובה רגילה וגם ב-chunk האחרון של הזרמה)
+    if usage is None:
+        return
+    LLM_TOKENS.inc("prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+    LLM_TOKENS.inc("completion", amount=getattr(usage, "completion_tokens", 0) or 0)
@@ -0,0 +1,101 @@
+# bot/outbound.py  –  הגבלת קצב לכל הבקשות היוצאות ל-Bot API: token bucket גלובלי ולכל צ'אט
+import asyncio, time
+from collections import OrderedDict
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from bot.metrics import TG_SECONDS, TG_THROTTLE_SECONDS
+
+GLOBAL_RATE    = 30.0          # הודעות לשנייה לכל הבוט (המגבלה של טלגרם)
+CHAT_RATE      = 1.0           # הודעות לשנייה לצ'אט פרטי
+GROUP_RATE     = 20 / 60       # הודעות לשנייה לקבוצה
+CHAT_BURST     = 3             # פרץ קצר מותר (תשובה + שאלה הבאה)
+MAX_CHAT_BUCKETS = 10000
+# לא שליחה לצ'אט – לא נספר במגבלות של טלגרם (כמו AIORateLimiter של PTB)
+EXEMPT_ENDPOINTS = frozenset({"answerCallbackQuery"})
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and not self._lock.locked()
+
+
+class TokenBucketRateLimiter(BaseRateLimiter[int]):
+    """
+    רק בקשה עם chat_id מוגבלת: הדלי הגלובלי ואז הדלי של אותו צ'אט. getFile / answerCallbackQuery /
+    setWebhook וכו' עוברות מיד – אחרת שתי קריאות לכל לחיצה חוסמות את כל הבוט בכ-15 תשובות לשנייה.
+    RetryAfter (429) מטופל בהמתנה ובניסיון חוזר, עד max_retries פעמים.
+    """
+
+    def __init__(self, max_retries: int = 2):
+        self.max_retries = max_retries
+        self._global = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self._chats: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self.throttled_429 = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        self._chats.clear()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            rate = GROUP_RATE if isinstance(chat_id, int) and chat_id < 0 else CHAT_RATE
+            bucket = self._chats[chat_id] = TokenBucket(rate, CHAT_BURST)
+            if len(self._chats) > MAX_CHAT_BUCKETS:
+                now = time.monotonic()
+                for cid in [c for c, b in self._chats.items() if b.idle(now)]:
+                    del self._chats[cid]
+        self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ):
+        max_retries = self.max_retries if rate_limit_args is None else rate_limit_args
+        chat_id = None if endpoint in EXEMPT_ENDPOINTS else data.get("chat_id")
+        for attempt in range(max_retries + 1):
+            if chat_id is not None:
+                with TG_THROTTLE_SECONDS.time():
+                    await self._global.acquire()
+                    await self._chat_bucket(chat_id).acquire()
+            try:
+                with TG_SECONDS.time(endpoint):
+                    return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                self.throttled_429 += 1
+                if attempt >= max_retries:
+                    raise
+                delay = e.retry_after
+                await asyncio.sleep((delay.total_seconds() if hasattr(delay, "total_seconds") else delay) + 0.1)
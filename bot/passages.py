@@ -0,0 +1,110 @@
+# bot/passages.py  –  בחירת קטעים אינפורמטיביים ומגוונים מהמסמך בתוך תקציב תווים/טוקנים
+import math, re
+from collections import Counter
+from typing import Dict, List
+
+CHUNK_CHARS   = 800       # אורך יעד לקטע
+MMR_LAMBDA    = 0.7       # איזון בין חשיבות (1.0) לגיוון (0.0)
+CHARS_PER_TOK = 3.0       # הערכה גסה לעברית/אנגלית מעורבת
+
+_WORD = re.compile(r"\w{2,}", re.U)
+_STOP = frozenset("""
+של את על עם זה זו זהו היא הוא הם הן או גם כי אם לא כל יש אין אשר כמו בין אל מה מי כך רק עוד
+שלא היה היו להיות ידי לפי כדי אך אבל כאשר בו בה בהם the and of to in is for on that with as are be by this an or it from at
+""".split())
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / CHARS_PER_TOK) + 1
+
+
+def split_chunks(text: str, size: int = CHUNK_CHARS) -> List[str]:
+    """מפצל לפי פסקאות/שורות ומאחד חלקים קצרים עד בערך size תווים; פסקה ארוכה מדי נחתכת לפי משפטים."""
+    chunks: List[str] = []
+    cur = ""
+    for para in re.split(r"\n\s*\n|\n", text):
+        para = para.strip()
+        if not para:
+            continue
+        pieces = [para] if len(para) <= size else re.split(r"(?<=[.!?])\s+", para)
+        for piece in pieces:
+            while len(piece) > size:                 # משפט ענק בלי פיסוק
+                if cur:
+                    chunks.append(cur)
+                    cur = ""
+                chunks.append(piece[:size])
+                piece = piece[size:]
+            if cur and len(cur) + len(piece) + 1 > size:
+                chunks.append(cur)
+                cur = ""
+            cur = f"{cur}\n{piece}" if cur else piece
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def _terms(chunk: str) -> Counter:
+    return Counter(w for w in (m.lower() for m in _WORD.findall(chunk)) if w not in _STOP and not w.isdigit())
+
+
+def _weights(chunks: List[str]) -> List[Dict[str, float]]:
+    tfs = [_terms(c) for c in chunks]
+    df: Counter = Counter()
+    for tf in tfs:
+        df.update(tf.keys())
+    n = len(chunks)
+    return [{t: (1 + math.log(c)) * math.log((1 + n) / (1 + df[t])) for t, c in tf.items()} for tf in tfs]
+
+
+def _normalized(vec: Dict[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+    return {t: v / norm for t, v in vec.items()}
+
+
+def _cos(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(t, 0.0) for t, v in a.items())
+
+
+def select_chunk_ids(chunks: List[str], budget_chars: int) -> List[int]:
+    """MMR חמדני: בכל צעד הקטע עם חשיבות גבוהה ודמיון נמוך למה שכבר נבחר, כל עוד נכנס בתקציב."""
+    if sum(len(c) for c in chunks) <= budget_chars:
+        return list(range(len(chunks)))
+    weights = _weights(chunks)
+    # אינפורמטיביות: סכום משקלי TF-IDF חלקי שורש האורך, כדי לא להעדיף סתם קטעים ארוכים
+    scores = [sum(w.values()) / math.sqrt(len(ch) + 1) for w, ch in zip(weights, chunks)]
+    top = max(scores) or 1.0
+    rel = [sc / top for sc in scores]
+    vecs = [_normalized(w) for w in weights]
+    chosen: List[int] = []
+    max_sim = [0.0] * len(chunks)
+    left = set(range(len(chunks)))
+    used = 0
+    while left:
+        best = max(left, key=lambda i: MMR_LAMBDA * rel[i] - (1 - MMR_LAMBDA) * max_sim[i])
+        left.discard(best)
+        if used + len(chunks[best]) > budget_chars:
+            continue
+        chosen.append(best)
+        used += len(chunks[best]) + 2
+        for i in left:
+            max_sim[i] = max(max_sim[i], _cos(vecs[best], vecs[i]))
+    return sorted(chosen)
+
+
+def select_passages(text: str, budget_chars: int, rotation: int = 0) -> str:
+    """
+    הטקסט המקוצר שנשלח ל-GPT: הקטעים שנבחרו, בסדר המקורי שלהם במסמך.
+    rotation=k מדלג על k הבחירות הקודמות (לסבב שאלות נוסף על אותו מסמך), ומתחיל מחדש כשהקטעים נגמרים.
+    """
+    if len(text) <= budget_chars:
+        return text
+    chunks = split_chunks(text)
+    pool = list(range(len(chunks)))
+    for r in range(rotation + 1):
+        picked = [pool[i] for i in select_chunk_ids([chunks[j] for j in pool], budget_chars)]
+        if r < rotation:
+            taken = set(picked)
+            pool = [j for j in pool if j not in taken] or list(range(len(chunks)))
+    return "\n\n".join(chunks[i] for i in sorted(picked))
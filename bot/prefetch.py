@@ -0,0 +1,108 @@
+# bot/prefetch.py  –  יצירת סבב השאלות הבא למסמך ברקע, בזמן שהמשתמש עונה על הסט הנוכחי
+import os, time, asyncio
+from typing import Optional, Set
+
+from bot import llm
+from bot.dedupe import DedupeIndex, clean
+from bot.file_index import FILE_INDEX
+from bot.metrics import Observed
+from bot.passages import estimate_tokens
+from bot.qa_generator import (
+    MAX_CHARS, MAX_COMPLETION_TOKENS, build_qa_from_text, is_fallback, llm_busy, questions_of,
+)
+from bot.quiz import load_set, save_set
+
+PREFETCH_MAX_BATCHES   = int(os.getenv("PREFETCH_MAX_BATCHES", "4"))        # כולל הסבב הראשון
+PREFETCH_TOKENS_HOUR   = int(os.getenv("PREFETCH_TOKENS_PER_HOUR", "60000"))
+PREFETCH_BATCH_SIZE    = 6
+_IDLE_POLL_SECS        = 0.5
+
+
+class TokenBudget:
+    """תקציב טוקנים מתחדש (חלון נע של שעה, מחושב כ-token bucket)."""
+
+    def __init__(self, per_hour: int):
+        self.capacity = per_hour
+        self.tokens = float(per_hour)
+        self.rate = per_hour / 3600.0
+        self.updated = time.monotonic()
+
+    def take(self, cost: int) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if cost > self.tokens:
+            return False
+        self.tokens -= cost
+        return True
+
+
+class Prefetcher:
+    """
+    worker יחיד שמעבד תור של סטים בסיסיים (מסמכים) שצריכים עוד שאלות.
+    עדיפות נמוכה: לפני כל בקשה מחכים שיהיה מקום פנוי ב-GPT, כך שמשתמשים שמעלים קבצים קודמים.
+    """
+
+    def __init__(self, budget: TokenBudget):
+        self.budget = budget
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._queued: Set[str] = set()
+        self._worker: Optional[asyncio.Task] = None
+        self.stats = {"batches": 0, "questions": 0, "skipped_budget": 0}
+
+    def schedule(self, base_id: str) -> None:
+        if base_id in self._queued:
+            return
+        self._queued.add(base_id)
+        self._queue.put_nowait(base_id)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._queue.empty():
+            base_id = self._queue.get_nowait()
+            try:
+                while llm_busy():
+                    await asyncio.sleep(_IDLE_POLL_SECS)
+                await self._fill(base_id)
+            except Exception as e:
+                print("❌ שגיאה ב-prefetch:", e)
+            finally:
+                self._queued.discard(base_id)
+
+    async def _fill(self, base_id: str) -> None:
+        base = load_set(base_id)
+        if not base or not base.get("sha") or not base.get("complete") or not llm.available():
+            return
+        batch = base.get("batches", 1)
+        if batch >= PREFETCH_MAX_BATCHES:
+            return
+        entry = FILE_INDEX.lookup(base["sha"])
+        if not entry or not entry.get("text"):
+            return
+        if not self.budget.take(estimate_tokens(entry["text"][:MAX_CHARS]) + MAX_COMPLETION_TOKENS):
+            self.stats["skipped_budget"] += 1
+            return
+
+        seen = [q["question"] for q in base["q"] if "question" in q]
+        qa = await build_qa_from_text(entry["text"], PREFETCH_BATCH_SIZE, batch=batch, avoid=seen)
+
+        base = load_set(base_id) or base          # ייתכן שהשתנה בזמן היצירה
+        known = DedupeIndex()
+        known.extend(base["q"])                   # גם ניסוח מחדש של שאלה שכבר בסט נזרק
+        fresh = clean((q for q in questions_of(qa) if not is_fallback(q)), known, source="prefetch")
+        if not fresh:
+            return
+        meta = {k: v for k, v in base.items() if k not in ("src", "base", "q")}
+        meta["batches"] = batch + 1
+        save_set(base_id, base["q"] + fresh, base["src"], base.get("base"), **meta)
+        self.stats["batches"] += 1
+        self.stats["questions"] += len(fresh)
+
+
+PREFETCH = Prefetcher(TokenBudget(PREFETCH_TOKENS_HOUR))
+
+Observed("edugo_prefetch_total", "Background batches generated, questions added, batches skipped for budget.",
+         lambda: PREFETCH.stats, ("event",), kind="counter")
+Observed("edugo_prefetch_queued", "Documents waiting for a background batch.", lambda: len(PREFETCH._queued))
+
@@ -0,0 +1,57 @@
+# bot/profiler.py  –  profiler דוגם (sampling) לשימוש בזמן ריצה: דוגם את ה-stack של כל ה-threads במרווח קבוע
+import sys, threading
+from collections import Counter
+from typing import Optional
+
+PROFILE_INTERVAL_SECS = 0.005
+PROFILE_MAX_SECS      = 60
+
+
+class SamplingProfiler:
+    """
+    thread רקע שקורא את sys._current_frames() כל interval ומונה stacks.
+    הפלט בפורמט "collapsed" (frame;frame;frame count) – מתאים ישירות ל-flamegraph.pl / speedscope.
+    העלות נמדדת רק בזמן שהדגימה רצה, אין hooks קבועים.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECS):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self.samples.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return "\n".join(f"{stack} {n}" for stack, n in self.samples.most_common()) + "\n"
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+
+PROFILER = SamplingProfiler()
+
+
+def sample_for(seconds: float) -> float:
+    return max(0.1, min(float(seconds), PROFILE_MAX_SECS))
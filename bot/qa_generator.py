@@ -1,95 +1,82 @@
 # bot/qa_generator.py  –  חילוץ טקסט, GPT עם חיתוך, Cache, מאגר קבוע
-import os, re, json, textwrap, hashlib
-from pathlib import Path
-from typing import List, Dict
+import os, re, json, math, time, textwrap, hashlib, asyncio
+from itertools import zip_longest
+from typing import AsyncIterator, List, Dict, Optional, Sequence
 
-# ─────────────  OpenAI (חדש)  ─────────────
-from openai import OpenAI
+from bot.bank import BANK
+from bot.dedupe import DedupeIndex, accept, clean
+from bot.cache import QA_CACHE
+from bot.singleflight import SingleFlight
+from bot.json_stream import JSONArrayStream
+from bot.passages import select_passages
+from bot.metrics import STAGE_SECONDS, Observed, record_usage
 
-try:
-    client = OpenAI()  # Requires env var OPENAI_API_KEY
-    _HAS_OPENAI = True
-except Exception as e:
-    print("⚠️ שגיאה בהתחברות ל־OpenAI:", e)
-    _HAS_OPENAI = False
+# ─────────────  OpenAI (timeouts / retries / circuit breaker ב-bot/llm.py)  ─────────────
+from bot import llm
+from bot.llm import LLMUnavailable
+
+# כמה בקשות GPT רצות במקביל; השאר ממתינות בלי לחסום את ה-event loop
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+_llm_sem = asyncio.Semaphore(LLM_CONCURRENCY)
+
+def llm_busy() -> bool:
+    """True כשכל מקומות ה-GPT תפוסים – עבודות רקע (prefetch) מחכות שיתפנה."""
+    return _llm_sem.locked()
 
 # ─────────────  הגבלות טוקנים/תווים  ─────────────
-MAX_CHARS      = 10000
-MAX_PAGES_PDF  = 20
-MAX_SLIDES_PPT = 20
+MAX_CHARS      = 10000      # תקציב הטקסט שנשלח ל-GPT בבקשה אחת (נבחר ע"י passages)
+MAX_COMPLETION_TOKENS = 2048
+AVOID_MAX      = 40         # כמה שאלות קודמות לכל היותר מצורפות לפרומפט כ"אל תחזור"
 
 # ─────────────  מאגר קבוע (bank.json)  ─────────────
 def load_bank() -> List[Dict]:
-    fp = Path("data/bank.json")
-    if fp.exists():
-        return json.loads(fp.read_text(encoding="utf-8"))
-    return []
+    return list(BANK.all())
 
 def pick_from_bank(k=6):
-    import random
-    bank = load_bank()
-    return random.sample(bank, k=min(k, len(bank))) if bank else _qa_via_placeholder("", k)
+    return BANK.sample(k) or _qa_via_placeholder("", k)
 
-# ─────────────  חילוץ טקסט מקובץ  ─────────────
-def extract_text(filepath: str) -> str:
-    fp = Path(filepath)
-    suf = fp.suffix.lower()
-    text = ""
-
-    try:
-        if suf == ".pdf":
-            from pypdf import PdfReader
-            reader = PdfReader(fp)
-            pages = reader.pages[:MAX_PAGES_PDF]
-            text = "\n".join(p.extract_text() or "" for p in pages)
-
-        elif suf in {".docx", ".doc"}:
-            import docx
-            doc = docx.Document(fp)
-            text = "\n".join(p.text for p in doc.paragraphs)
-
-        elif suf == ".pptx":
-            from pptx import Presentation
-            prs = Presentation(fp)
-            slides = prs.slides[:MAX_SLIDES_PPT]
-            text = "\n".join(
-                shape.text
-                for slide in slides
-                for shape in slide.shapes
-                if hasattr(shape, "text") and isinstance(shape.text, str)
-            )
-
-    except Exception as e:
-        print("❌ שגיאה בקריאת הקובץ:", e)
-        return ""
+def is_fallback(q: Dict) -> bool:
+    # שאלות מהמאגר (ו-placeholder) נושאות "id"; שאלות של GPT – לא
+    return "id" in q
 
-    return text.strip()[:MAX_CHARS]
+def _fallback(n: int) -> List[Dict]:
+    """כש-GPT לא זמין: שאלות אמיתיות מהמאגר. לעולם לא נשמר ב-cache."""
+    return pick_from_bank(n)
 
 # ─────────────  Cache לפי hash  ─────────────
-CACHE_DIR = "/tmp/qa_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
+INFLIGHT = SingleFlight()   # INFLIGHT.stats["coalesced"] = כמה קריאות GPT נחסכו
+
+Observed("edugo_generation_calls_total", "build_qa calls that ran generation (leaders) or joined one (coalesced).",
+         lambda: INFLIGHT.stats, ("role",), kind="counter")
+# סדרה לכל יצירה שרצה עכשיו (נעלמת כשהיא מסתיימת), כך שהמספר נשאר קטן
+Observed("edugo_generation_waiters", "Calls currently waiting on an in-flight generation, per cache key.",
+         INFLIGHT.inflight, ("key",))
 
 def _cached(key: str):
-    fp = Path(CACHE_DIR) / f"{key}.json"
-    if fp.exists():
-        t = json.loads(fp.read_text())
-        return t
-    return None
+    return QA_CACHE.get(key)
 
 def _save_cache(key: str, data):
-    Path(CACHE_DIR, f"{key}.json").write_text(json.dumps(data, ensure_ascii=False))
+    QA_CACHE.set(key, data)
+
+def qa_cache_key(txt: str, n: int, batch: int = 0) -> str:
+    # batch > 0 = סבב נוסף של שאלות על אותו טקסט (prefetch), נשמר בנפרד
+    return hashlib.md5(txt.encode()).hexdigest() + f"_{n}" + (f"_b{batch}" if batch else "")
 
 # ─────────────  יצירת שאלות  ─────────────
-def build_qa_from_text(txt: str, n: int = 6) -> List[Dict]:
+async def build_qa_from_text(txt: str, n: int = 6, batch: int = 0, avoid: Sequence[str] = ()) -> List[Dict]:
+    with STAGE_SECONDS.time("build_qa"):
+        return await _build_qa(txt, n, batch, avoid)
+
+async def _build_qa(txt: str, n: int, batch: int, avoid: Sequence[str]) -> List[Dict]:
     if not isinstance(txt, str):
         print("⚠️ הטקסט שחולץ איננו string אלא:", type(txt))
-        return _qa_via_placeholder("", n)
+        return _fallback(n)
 
     try:
-        key = hashlib.md5(txt.encode()).hexdigest() + f"_{n}"
+        key = qa_cache_key(txt, n, batch)
     except Exception as e:
         print("❌ שגיאה בעיבוד טקסט:", e)
-        return _qa_via_placeholder("", n)
+        return _fallback(n)
 
     try:
         cached = _cached(key)
@@ -97,28 +84,250 @@ def build_qa_from_text(txt: str, n: int = 6) -> List[Dict]:
             return cached
     except Exception as e:
         print("❌ שגיאה בקריאת cache:", e)
-        return _qa_via_placeholder(txt, n)
 
     try:
-        qa = _qa_via_gpt(txt, n) if _HAS_OPENAI else _qa_via_placeholder(txt, n)
-
-        # 🔒 סינון שאלות לא תקינות:
-        if isinstance(qa, dict) and "questions" in qa:
-            qa["questions"] = [
-                q for q in qa["questions"]
-                if all(k in q for k in ("question", "options", "type", "correct"))
-                and isinstance(q["options"], list)
-            ]
-        _save_cache(key, qa)
-        return qa
+        # כמה משתמשים שהעלו את אותו קובץ באותו רגע → בקשת GPT אחת
+        return await INFLIGHT.do(key, lambda: _generate(txt, n, key, batch, avoid))
+    except LLMUnavailable as e:
+        print("⚠️ GPT לא זמין, שאלות מהמאגר:", e)
+        return _fallback(n)
     except Exception as e:
         print("❌ שגיאה ביצירת שאלות GPT:", e)
-        return _qa_via_placeholder(txt, n)
+        return _fallback(n)
+
+async def _generate(txt: str, n: int, key: str, batch: int = 0, avoid: Sequence[str] = ()):
+    if needs_map_reduce(txt):
+        qa, complete = await _map_reduce(txt, n, batch, avoid)
+        if complete:            # חלק מהמקטעים נכשלו → לא נשמר, בפעם הבאה ננסה רק אותם (השאר ב-cache)
+            _save_cache(key, qa)
+        return qa
+    return await _generate_single(txt, n, key, batch, avoid)
+
+async def _generate_single(txt: str, n: int, key: str, batch: int = 0, avoid: Sequence[str] = ()):
+    if not llm.HAS_OPENAI:
+        raise LLMUnavailable("OpenAI not configured")
+    qa = await _qa_via_gpt(txt, n, batch, avoid)
+
+    # 🔒 סינון שאלות לא תקינות וכמעט-כפולות:
+    qa["questions"] = clean(qa["questions"])
+    if not qa["questions"]:
+        raise LLMUnavailable("no valid questions in response")
+    _save_cache(key, qa)
+    return qa
+
+def questions_of(qa) -> List[Dict]:
+    return qa["questions"] if isinstance(qa, dict) else qa
+
+
+# ─────────────  Map-reduce למסמכים ארוכים  ─────────────
+MAX_SEGMENTS        = int(os.getenv("MAX_SEGMENTS", "4"))
+SEGMENT_CONCURRENCY = int(os.getenv("SEGMENT_CONCURRENCY", "3"))
+SEGMENT_MIN_CHARS   = MAX_CHARS              # מקטע לא נחתך לפני זה...
+SEGMENT_MAX_CHARS   = 2 * MAX_CHARS          # ...ולא מתארך מעבר לזה; בתוך המקטע passages בוחר MAX_CHARS
+SEGMENT_SPREAD      = MAX_CHARS // 2         # אורך ממוצע אחרי המינימום עד גבול שנקבע לפי התוכן
+
+def needs_map_reduce(txt: str) -> bool:
+    return llm.HAS_OPENAI and len(txt) > MAX_CHARS
+
+def segment_questions(n: int) -> int:
+    # קצת יותר מ-n/2, כדי שיישאר מה לבחור אחרי סינון כפולים. לא תלוי במספר המקטעים: הוא חלק ממפתח
+    # ה-cache של המקטע, ושינוי במספר המקטעים היה מחליף את המפתח של כולם
+    return max(2, math.ceil(n / 2) + 1)
+
+def _digest(s: str) -> float:
+    """מספר יציב ב-[0, 1) לפי התוכן (לא hash() של Python, שמשתנה בין תהליכים)."""
+    return int(hashlib.md5(s.encode()).hexdigest()[:12], 16) / 16 ** 12
+
+def _cut_score(unit: str) -> float:
+    # < 1 → גבול מקטע; יחידה ארוכה סוגרת בהסתברות גבוהה יותר, כך שהגבולות מתפזרים לפי תווים
+    return _digest(unit) * SEGMENT_SPREAD / len(unit)
+
+def _units(txt: str):
+    # פסקאות/שורות; רק פסקה ארוכה מ-MAX_CHARS נחתכת (לפי משפטים) – כל חיתוך תלוי בפסקה עצמה בלבד
+    for para in re.split(r"\n\s*\n|\n", txt):
+        para = para.strip()
+        if len(para) <= MAX_CHARS:
+            if para:
+                yield para
+            continue
+        for piece in re.split(r"(?<=[.!?])\s+", para):
+            while piece:
+                yield piece[:MAX_CHARS]
+                piece = piece[MAX_CHARS:]
+
+def _fallback_cut(cur: List[str]) -> int:
+    """אין גבול עד SEGMENT_MAX_CHARS – חותכים אחרי היחידה עם הציון הנמוך ביותר מעבר למינימום."""
+    size, best, best_score = 0, len(cur), float("inf")
+    for i, unit in enumerate(cur):
+        size += len(unit) + 1
+        if size >= SEGMENT_MIN_CHARS and _cut_score(unit) < best_score:
+            best, best_score = i + 1, _cut_score(unit)
+    return best
+
+def split_segments(txt: str) -> List[str]:
+    """
+    גבולות לפי התוכן (content-defined chunking): אחרי SEGMENT_MIN_CHARS, פסקה עם ציון נמוך מספיק סוגרת
+    מקטע. עריכה / הוספה / מחיקה של פסקה משנה רק את המקטע שלה (ולכל היותר את הבא, אם היא עצמה הייתה
+    גבול) – השאר נשלפים מה-cache, בלי קשר לאורך המסמך כולו.
+    כשיש יותר מ-MAX_SEGMENTS נשמרים אלה עם ה-digest הנמוך ביותר (בסדר המסמך) – גם הבחירה לא זזה
+    כשמקטע אחר משתנה.
+    """
+    segs: List[str] = []
+    cur: List[str] = []
+    size = 0
+    for unit in _units(txt):
+        cur.append(unit)
+        size += len(unit) + 1
+        if size >= SEGMENT_MIN_CHARS and _cut_score(unit) < 1:
+            cut = len(cur)
+        elif size >= SEGMENT_MAX_CHARS:
+            cut = _fallback_cut(cur)
+        else:
+            continue
+        segs.append("\n".join(cur[:cut]))
+        cur = cur[cut:]
+        size = sum(len(u) + 1 for u in cur)
+    if cur:
+        if segs and size < SEGMENT_MIN_CHARS // 2:
+            segs[-1] += "\n" + "\n".join(cur)     # שארית קצרה לא שווה בקשת GPT משלה
+        else:
+            segs.append("\n".join(cur))
+    if len(segs) > MAX_SEGMENTS:
+        keep = sorted(sorted(range(len(segs)), key=lambda i: _digest(segs[i]))[:MAX_SEGMENTS])
+        segs = [segs[i] for i in keep]
+    return segs
+
+async def _segment_qa(seg: str, n: int, batch: int = 0, avoid: Sequence[str] = ()) -> List[Dict]:
+    key = qa_cache_key(seg, n, batch)
+    cached = _cached(key)
+    if cached:
+        return questions_of(cached)
+    return questions_of(await INFLIGHT.do(key, lambda: _generate_single(seg, n, key, batch, avoid)))
+
+async def _map_reduce(txt: str, n: int, batch: int = 0, avoid: Sequence[str] = ()):
+    segs = split_segments(txt)
+    per = n if len(segs) == 1 else segment_questions(n)
+    sem = asyncio.Semaphore(SEGMENT_CONCURRENCY)
+
+    async def one(seg: str):
+        async with sem:
+            return await _segment_qa(seg, per, batch, avoid)
+
+    results = await asyncio.gather(*(one(seg) for seg in segs), return_exceptions=True)
+    parts = []
+    for r in results:
+        if isinstance(r, BaseException):
+            print("❌ שגיאה ביצירת שאלות למקטע:", r)
+        else:
+            parts.append(r)
+    if not parts:
+        raise LLMUnavailable("all segments failed")
+    return {"questions": merge_questions(parts, n)}, len(parts) == len(segs)
+
+def merge_questions(parts: List[List[Dict]], n: int) -> List[Dict]:
+    """איחוד תוצאות המקטעים: חלוקה מאוזנת (round-robin) בין המקטעים, בלי לא-תקינות וכמעט-כפולות, עד n שאלות."""
+    order = [q for row in zip_longest(*parts) for q in row if q is not None]
+    return clean(order)[:n]
+
+
+# ─────────────  יצירה בהזרמה  ─────────────
+async def stream_qa_from_text(txt: str, n: int = 6, status: Optional[Dict] = None) -> AsyncIterator[Dict]:
+    """
+    כמו build_qa_from_text, אבל מחזיר כל שאלה ברגע שהאובייקט שלה נסגר בתשובת GPT.
+    אם הסט כבר ב-cache או שמישהו אחר כבר מייצר אותו – מחזיר את הסט המלא מיד כשהוא מוכן.
+    בסוף נכתב status["broken"]: True אם מה שהוחזר הוא לא הסט המלא (הזרמה שנקטעה, מקטעים שנכשלו,
+    שאלות מהמאגר) – רק סט שנשמר ב-cache נחשב שלם.
+    """
+    key = qa_cache_key(txt, n)
+    # מסמך ארוך עובר map-reduce מקבילי, שמהיר יותר מהזרמה של בקשה אחת
+    if not llm.available() or needs_map_reduce(txt) or INFLIGHT.running(key) or _cached(key):
+        for q in questions_of(await build_qa_from_text(txt, n)):
+            yield q
+        _mark(status, key)
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.ensure_future(INFLIGHT.do(key, lambda: _generate_streaming(txt, n, key, queue)))
+    sent = 0
+    while (q := await queue.get()) is not None:
+        sent += 1
+        yield q
+    try:
+        qa = await task
+    except Exception as e:
+        print("⚠️ GPT לא זמין, שאלות מהמאגר:", e)
+        qa = _fallback(n)
+    if not sent:
+        for q in questions_of(qa):
+            yield q
+    _mark(status, key)
+
+def _mark(status: Optional[Dict], key: str) -> None:
+    if status is not None:
+        status["broken"] = not _cached(key)
+
+async def _generate_streaming(txt: str, n: int, key: str, queue: asyncio.Queue):
+    parser = JSONArrayStream()
+    questions: List[Dict] = []
+    seen = DedupeIndex()
+
+    async def consume(stream):
+        async for chunk in stream:
+            record_usage(getattr(chunk, "usage", None))
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            for q in parser.feed(delta):
+                q = accept(q, seen, "gpt")
+                if q is not None:
+                    questions.append(q)
+                    queue.put_nowait(q)
+
+    broken = False
+    try:
+        async with _llm_sem:
+            # ה-deadline מתחיל אחרי שקיבלנו מקום – המתנה בתור מקומי לא נחשבת כשל של OpenAI
+            deadline = time.monotonic() + llm.LLM_DEADLINE_SECS
+            stream = await llm.complete(
+                deadline,
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": _build_prompt(txt, n)}],
+                max_tokens=MAX_COMPLETION_TOKENS,
+                temperature=0.2,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            try:
+                await asyncio.wait_for(consume(stream), max(0.0, llm.remaining(deadline)))
+                llm.BREAKER.success()
+            except (asyncio.TimeoutError, llm.api_error()) as e:
+                # ההזרמה נקטעה – מה שכבר נשלח נשאר אצל המשתמש, אבל סט חלקי לא נשמר
+                print("⚠️ הזרמת GPT נקטעה:", type(e).__name__)
+                llm.BREAKER.failure()
+                broken = True
+                await _close(stream)
+    finally:
+        queue.put_nowait(None)
+
+    if not questions:
+        raise LLMUnavailable("no valid questions in streamed response")
+    qa = {"questions": questions}
+    if not broken:
+        _save_cache(key, qa)
+    return qa
+
+
+async def _close(stream) -> None:
+    # משחרר את חיבור ה-HTTP של stream שלא נצרך עד הסוף
+    try:
+        await stream.close()
+    except Exception as e:
+        print("⚠️ סגירת stream נכשלה:", e)
 
 
 # --- GPT ---
-def _qa_via_gpt(txt: str, n: int):
-    prompt = textwrap.dedent(f"""
+def _build_prompt(txt: str, n: int, batch: int = 0, avoid: Sequence[str] = ()) -> str:
+    return textwrap.dedent(f"""
     צור בדיוק {n} שאלות בעברית על בסיס הטקסט הבא.
 
     - כל השאלות חייבות להיות במבנה JSON.
@@ -136,38 +345,48 @@ def _qa_via_gpt(txt: str, n: int):
     }},
     ...
     ]
-    """ + txt[:MAX_CHARS])
+    """ + _avoid_clause(avoid) + select_passages(txt, MAX_CHARS, rotation=batch))
+
+def _avoid_clause(avoid: Sequence[str]) -> str:
+    if not avoid:
+        return ""
+    listed = "\n".join(f"- {q[:120]}" for q in list(avoid)[-AVOID_MAX:])
+    return f"\nאל תחזור על השאלות הבאות ואל תנסח אותן מחדש:\n{listed}\n\n"
 
-    rsp = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=2048,
-        temperature=0.2,
-    )
+async def _qa_via_gpt(txt: str, n: int, batch: int = 0, avoid: Sequence[str] = ()):
+    async with _llm_sem:
+        rsp = await llm.complete(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": _build_prompt(txt, n, batch, avoid)}],
+            max_tokens=MAX_COMPLETION_TOKENS,
+            temperature=0.2 if not batch else 0.7,
+        )
 
     content = rsp.choices[0].message.content
     # print("📥 תשובה מ־GPT:\n", content[:300])
 
-    match = re.search(r"\[\s*\{.*?\}\s*\]", content, re.S)
+    match = re.search(r"\[\s*\{.*?\}\s*\]", content or "", re.S)
     if not match:
-        print("⚠️ לא נמצא JSON תקני בתשובה")
-        return _qa_via_placeholder(txt, n)
+        raise LLMUnavailable("no JSON array in response")
 
     try:
         parsed = json.loads(match.group())
-        return {"questions": parsed}
-    except Exception as e:
-        print("❌ שגיאה ב־json.loads():", e)
-        return _qa_via_placeholder(txt, n)
+    except ValueError as e:
+        raise LLMUnavailable(f"json.loads() failed: {e}") from e
+    if not isinstance(parsed, list):
+        raise LLMUnavailable("response is not a list")
+    return {"questions": parsed}
 
 
-# --- Placeholder ---
+# --- Placeholder (רק כשגם המאגר ריק) ---
 def _qa_via_placeholder(txt: str, n: int):
+    # שאלה אחת ולא n עותקים שלה – אותה שאלה שוב ושוב באותו סט היא בדיוק החזרה שאנחנו מסננים
     return [
         {
+            "id": "placeholder",
             "type": "true_false",
             "question": "זהו משפט דוגמה – OpenAI לא פעיל.",
             "options": ["נכון", "לא נכון"],
             "correct": "נכון",
         }
-    ] * n
+    ]
@@ -0,0 +1,264 @@
+# bot/quiz.py  –  סטים של שאלות + callback_data חתום, כך שכל worker יכול לבדוק לחיצה בלי זיכרון מקומי
+import os, re, hmac, json, time, base64, hashlib, secrets, sqlite3, threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from bot.bank import BANK
+from bot.sessions import BUSY_SECS, SESSION_DB, SESSION_STORE, SESSIONS
+
+_SECRET = (os.getenv("CALLBACK_SECRET") or os.getenv("BOT_TOKEN") or "dev").encode()
+_SIG_BYTES = 6          # 8 תווי base64 – מספיק נגד זיוף callback_data, וקצר בתוך מגבלת 64 הבתים
+_LETTER = re.compile(r"^([א-ת])\.\s*(.+)")
+SET_TTL_SECS  = int(os.getenv("SET_TTL_SECS", str(30 * 24 * 3600)))
+SET_MEM_ITEMS = int(os.getenv("SET_MEM_ITEMS", "2000"))
+PERSONAL_SETS = 3       # כמה סטים אישיים אחרונים נשמרים בסשן (כפתורים בהודעות קודמות עדיין עובדים)
+
+# ─────────────  סטים  ─────────────
+# סט: {"src": "bank"|"gpt", "base": <set_id של המסמך או None>, "q": [...]}, בשני מקומות:
+#   סט בסיסי של מסמך ("g…")  – השאלות המלאות מ-GPT, משותף לכל המשתמשים ולכל ה-workers → SETS
+#   סט אישי (token_hex)       – רק הפניות, בסשן של המשתמש (PERSONAL_SETS האחרונים); בלי כתיבה לדיסק בכל לחיצה
+# כל פריט ב-"q" הוא אחד מ:
+#   {"b": <bank id>}            – שאלה מהמאגר
+#   {"s": <set_id>, "i": <idx>} – שאלה מתוך סט אחר (הסט הבסיסי של מסמך)
+#   dict שאלה מלא               – שאלות שנוצרו ע"י GPT, נשמרות פעם אחת לכל מסמך
+
+
+class MemorySetStore:
+    """תהליך יחיד (SESSION_STORE=memory): LRU לפי גישה, TTL לפי כתיבה."""
+
+    def __init__(self, max_items: int = SET_MEM_ITEMS, ttl: float = SET_TTL_SECS):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, set_id: str) -> Optional[Dict]:
+        with self._lock:
+            hit = self._data.get(set_id)
+            if hit is None or time.time() - hit[0] >= self.ttl:
+                return None
+            self._data.move_to_end(set_id)
+            return hit[1]
+
+    def put(self, set_id: str, value: Dict) -> None:
+        with self._lock:
+            self._data[set_id] = (time.time(), value)
+            self._data.move_to_end(set_id)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteSetStore:
+    """
+    טבלת sets בקובץ של הסשנים (WAL), משותפת לכל ה-workers ומחוץ לתקציב הפינוי של QA_CACHE.
+    כתיבה מיידית – סט בסיסי נכתב רק בהעלאה וב-prefetch. קריאה היא שליפה לפי מפתח; הערך המפוענח
+    נשמר בזיכרון כל עוד ה-updated של השורה לא השתנה, כך שלחיצה לא מפענחת JSON מחדש.
+    """
+
+    def __init__(self, path: str = SESSION_DB, ttl: float = SET_TTL_SECS, mem_items: int = SET_MEM_ITEMS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl
+        self.mem_items = mem_items
+        self._db = sqlite3.connect(path, timeout=BUSY_SECS, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sets ("
+            " id TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._front: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+
+    def _remember(self, set_id: str, updated: float, value: Dict) -> None:
+        self._front[set_id] = (updated, value)
+        self._front.move_to_end(set_id)
+        if len(self._front) > self.mem_items:
+            self._front.popitem(last=False)
+
+    def get(self, set_id: str) -> Optional[Dict]:
+        with self._lock:
+            cached = self._front.get(set_id)
+            # data חוזר רק אם השורה השתנתה מאז מה שיש בזיכרון
+            row = self._db.execute(
+                "SELECT updated, CASE WHEN updated = ? THEN NULL ELSE data END FROM sets"
+                " WHERE id = ? AND updated > ?",
+                (cached[0] if cached else -1.0, set_id, time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                self._front.pop(set_id, None)
+                return None
+            if row[1] is None:
+                self._front.move_to_end(set_id)
+                return cached[1]
+            value = json.loads(row[1])
+            self._remember(set_id, row[0], value)
+            return value
+
+    def put(self, set_id: str, value: Dict) -> None:
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sets(id, data, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated = excluded.updated",
+                (set_id, data, now),
+            )
+            self._remember(set_id, now, value)
+            if now >= self._next_purge:
+                self._db.execute("DELETE FROM sets WHERE updated < ?", (now - self.ttl,))
+                self._next_purge = now + 3600
+
+    def close(self) -> None:
+        self._db.close()
+
+
+SETS = SQLiteSetStore() if SESSION_STORE == "sqlite" else MemorySetStore()
+
+
+def new_set_id() -> str:
+    return secrets.token_hex(6)
+
+
+def doc_set_id(qa_key: str) -> str:
+    # אותו מסמך → אותו סט בסיסי לכל המשתמשים
+    return "g" + qa_key[:11]
+
+
+def is_doc_set(set_id: str) -> bool:
+    return set_id.startswith("g")       # new_set_id מחזיר hex, שלא מתחיל ב-g
+
+
+def save_set(set_id: str, items: List[Dict], src: str, base: Optional[str] = None,
+             uid: Optional[int] = None, **meta) -> None:
+    # meta לסט בסיסי של מסמך: "sha" (לשליפת הטקסט מ-FILE_INDEX), "batches" (כמה סבבי GPT כבר נוספו),
+    # "streamed" (כמה שאלות הגיעו בהזרמה – שם נגמר הסט למי שהעלה את המסמך),
+    # "complete" (ההזרמה הסתיימה בלי להיקטע – רק סט כזה ממוחזר בהעלאה הבאה)
+    value = {"src": src, "base": base, "q": list(items), **meta}
+    if is_doc_set(set_id):
+        SETS.put(set_id, value)
+        return
+    sess = SESSIONS.get(uid)
+    sets = sess.get("sets", {})
+    sets.pop(set_id, None)
+    sets[set_id] = value
+    sess["sets"] = dict(list(sets.items())[-PERSONAL_SETS:])
+    SESSIONS.put(uid, sess)
+
+
+def load_set(set_id: str, uid: Optional[int] = None) -> Optional[Dict]:
+    """סט בסיסי של מסמך – מ-SETS; סט אישי – מהסשן של uid (None אם לא שלו / כבר לא שמור)."""
+    if is_doc_set(set_id):
+        return SETS.get(set_id)
+    if uid is None:
+        return None
+    return SESSIONS.get(uid).get("sets", {}).get(set_id)
+
+
+def _resolve(set_id: str, pos: int, item: Dict, depth: int = 0) -> Tuple[Optional[tuple], Optional[Dict]]:
+    """(מפתח יציב לשאלה, ה-dict שלה)."""
+    if "question" in item:
+        return ("s", set_id, pos), item
+    if "b" in item:
+        return ("b", item["b"]), BANK.get(item["b"])
+    if "s" in item and depth < 2:
+        base = load_set(item["s"])
+        if base and 0 <= item["i"] < len(base["q"]):
+            return _resolve(item["s"], item["i"], base["q"][item["i"]], depth + 1)
+    return None, None
+
+
+def option_entries(q: Dict) -> List[Tuple[str, str]]:
+    """(אות לכפתור, טקסט האפשרות המלא) לכל אפשרות, לפי הסדר."""
+    out = []
+    multiple = q.get("type", "").lower() == "multiple"
+    for idx, opt in enumerate(q["options"]):
+        opt = opt.strip()
+        if multiple:
+            match = _LETTER.match(opt)
+            if match:
+                out.append((match.group(1).strip(), opt))
+            else:
+                letter = chr(ord("א") + idx)
+                out.append((letter, f"{letter}. {opt}"))
+        else:
+            out.append((opt, opt))    # נכון / לא נכון
+    return out
+
+
+# ─────────────  שאלה מהודרת  ─────────────
+class QuizQuestion:
+    """
+    שאלה אחרי פענוח חד-פעמי: טקסט ההודעה המוכן, תוויות הכפתורים, ומיפוי אות → אפשרות מלאה.
+    השליחה והבדיקה לא מריצות regex ולא בונות מחרוזות.
+    """
+    __slots__ = ("src", "text", "labels", "full_by_label", "correct", "full_answer")
+
+    def __init__(self, q: Dict):
+        entries = option_entries(q)
+        self.src = q
+        self.text = (f"{q['question'].strip()}\n\n" + "".join(f"{full}\n" for _, full in entries)).strip()
+        self.labels = tuple(letter for letter, _ in entries)
+        self.full_by_label = {letter.lower(): full for letter, full in entries}
+        self.correct = str(q.get("correct") or q.get("answer") or "").strip()
+        self.full_answer = self.full_by_label.get(self.correct.lower(), self.correct)
+
+    def is_correct(self, idx: int) -> bool:
+        return 0 <= idx < len(self.labels) and self.labels[idx] == self.correct
+
+
+_COMPILED_MAX = 4096
+_compiled: "OrderedDict[tuple, QuizQuestion]" = OrderedDict()
+
+
+def compiled(key: Optional[tuple], q: Optional[Dict]) -> Optional[QuizQuestion]:
+    # תקף כל עוד זה אותו אובייקט מקור (מאגר שנטען מחדש / סט שיצא מה-cache → מהדרים שוב)
+    if q is None:
+        return None
+    rec = _compiled.get(key)
+    if rec is None or rec.src is not q:
+        rec = _compiled[key] = QuizQuestion(q)
+        if len(_compiled) > _COMPILED_MAX:
+            _compiled.popitem(last=False)
+    else:
+        _compiled.move_to_end(key)
+    return rec
+
+
+def question_at(quiz: Optional[Dict], set_id: str, pos: int) -> Optional[QuizQuestion]:
+    if not quiz or not 0 <= pos < len(quiz["q"]):
+        return None
+    return compiled(*_resolve(set_id, pos, quiz["q"][pos]))
+
+
+# ─────────────  callback_data  ─────────────
+class Tap(NamedTuple):
+    kind: str       # "a" = תשובה, "c" = המשך אחרי סוף סט
+    set_id: str
+    pos: int
+    choice: str     # אינדקס האפשרות / "s" לדילוג / "y" | "n" להמשך
+
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(_SECRET, payload.encode(), hashlib.sha256).digest()[:_SIG_BYTES]
+    return base64.urlsafe_b64encode(digest).decode()
+
+
+def encode_tap(kind: str, set_id: str, pos: int = 0, choice: str = "") -> str:
+    payload = f"{kind}{set_id}.{pos}.{choice}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_tap(data: str) -> Optional[Tap]:
+    """None אם הנתונים לא במבנה הנכון או שהחתימה לא תואמת (כפתור ישן / מזויף)."""
+    payload, _, sig = data.rpartition(".")
+    if not payload or not hmac.compare_digest(sig, _sign(payload)):
+        return None
+    try:
+        head, pos, choice = payload.split(".")
+        return Tap(head[0], head[1:], int(pos), choice)
+    except ValueError:
+        return None
@@ -0,0 +1,215 @@
+# bot/scheduler.py  –  בחירת שאלות מהמאגר לכל משתמש: בלי חזרות, וחזרה מרווחת (Leitner) על מה שכבר נענה
+import time, heapq, base64, hashlib
+from array import array
+from collections import OrderedDict
+from math import gcd
+from typing import Dict, List, Optional, Tuple
+
+from bot.bank import BANK
+from bot.metrics import Counter
+from bot.sessions import SESSIONS
+
+# מרווחי החזרה לפי "קופסה" (בדקות): טעות → קופסה 0, תשובה נכונה → הקופסה הבאה
+INTERVALS_MIN  = (10, 24 * 60, 3 * 24 * 60, 7 * 24 * 60, 16 * 24 * 60, 35 * 24 * 60)
+SKIP_DELAY_MIN = 30
+MAX_TRACKED    = 5000        # רשומות לכל משתמש; מעבר לזה נזרקת השאלה הכי "רחוקה" (הכי נלמדה)
+DECK_CACHE     = 2048        # חפיסות מפוענחות בזיכרון (לפי uid)
+SCAN_LIMIT     = 4096        # כמה צעדי cursor לכל היותר בבחירה אחת (ה-cursor נשמר, הבחירה הבאה ממשיכה משם)
+
+PICKS = Counter("edugo_bank_picks_total", "Bank questions served, by reason.", ("kind",))
+
+
+def _qnum(qid: str) -> int:
+    return int(qid, 16) & 0xFFFFFFFF
+
+
+def _qid(num: int) -> str:
+    return f"{num:08x}"
+
+
+def _now_min() -> int:
+    return int(time.time() // 60)
+
+
+class Deck:
+    """
+    ההיסטוריה של משתמש אחד מול המאגר, בשלושה מערכים מקבילים (4 + 4 + 1 בתים לשאלה):
+      ids  – מזהה השאלה (8 ה-hex של question_id כמספר 32 ביט)
+      due  – מתי לחזור אליה (דקות מ-epoch)
+      box  – הקופסה הנוכחית
+    + heap של (due, slot) לשליפת הבאה בתור ב-O(log n), ו-cursor לשאלות שעוד לא נראו.
+    ה-heap בנוי עם מחיקה עצלה: רשומה שה-due שלה השתנה נשארת בו ומדולגת כשהיא עולה.
+    """
+    __slots__ = ("ids", "due", "box", "cursor", "_slot", "_heap")
+
+    def __init__(self, ids: array, due: array, box: bytearray, cursor: int = 0):
+        self.ids, self.due, self.box, self.cursor = ids, due, box, cursor
+        self._slot: Dict[int, int] = {q: i for i, q in enumerate(ids)}
+        self._heap: List[Tuple[int, int]] = [(d, i) for i, d in enumerate(due)]
+        heapq.heapify(self._heap)
+
+    # ─────────────  קידוד לסשן  ─────────────
+    @classmethod
+    def decode(cls, raw: Optional[Dict]) -> "Deck":
+        if not raw:
+            return cls(array("I"), array("I"), bytearray())
+        data = base64.b64decode(raw["d"])
+        n = len(data) // 9
+        ids, due = array("I"), array("I")
+        ids.frombytes(data[:4 * n])
+        due.frombytes(data[4 * n:8 * n])
+        return cls(ids, due, bytearray(data[8 * n:]), raw.get("c", 0))
+
+    def encode(self) -> Dict:
+        data = self.ids.tobytes() + self.due.tobytes() + bytes(self.box)
+        return {"c": self.cursor, "d": base64.b64encode(data).decode()}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def seen(self, qnum: int) -> bool:
+        return qnum in self._slot
+
+    # ─────────────  שליפה  ─────────────
+    def _pop_valid(self) -> Optional[Tuple[int, int]]:
+        while self._heap:
+            due, slot = heapq.heappop(self._heap)
+            if slot < len(self.due) and self.due[slot] == due:
+                return due, slot
+        return None
+
+    def due_slots(self, k: int, now: int, early: bool = False) -> List[int]:
+        """עד k שאלות שהגיע זמנן (או, עם early, הקרובות ביותר גם אם עוד לא), לפי due."""
+        taken: List[Tuple[int, int]] = []
+        slots = set()
+        while len(taken) < k:
+            top = self._pop_valid()
+            if top is None:
+                break
+            if top[1] in slots:          # אותה רשומה נדחפה פעמיים עם אותו due – העותק נזרק
+                continue
+            slots.add(top[1])
+            taken.append(top)
+            if top[0] > now and not early:
+                break
+        for entry in taken:
+            heapq.heappush(self._heap, entry)          # הבחירה לא משנה את ה-due; רק התשובה משנה
+        return [slot for due, slot in taken if early or due <= now]
+
+    # ─────────────  תשובה  ─────────────
+    def record(self, qnum: int, box: int, due: int) -> None:
+        slot = self._slot.get(qnum)
+        if slot is None:
+            if len(self.ids) >= MAX_TRACKED:
+                slot = max(range(len(self.due)), key=self.due.__getitem__)
+                del self._slot[self.ids[slot]]
+                self.ids[slot] = qnum
+            else:
+                slot = len(self.ids)
+                self.ids.append(qnum)
+                self.due.append(0)
+                self.box.append(0)
+            self._slot[qnum] = slot
+        self.due[slot] = due
+        self.box[slot] = min(box, len(INTERVALS_MIN) - 1)
+        heapq.heappush(self._heap, (due, slot))
+
+
+class Scheduler:
+    """
+    pick: קודם שאלות שהגיע זמן החזרה עליהן, אחר כך שאלות שהמשתמש עוד לא ראה,
+    ורק כשהמאגר נגמר – החזרות הבאות בתור, גם אם מוקדם.
+    שאלות חדשות עוברות על המאגר בפרמוטציה אפינית אישית, i → (a·i + b) mod n,
+    כך שכל המצב הוא cursor אחד לכל משתמש ואין צורך לשמור סדר מעורבב.
+    המצב נשמר בסשן תחת "deck"; חפיסה מפוענחת נשמרת ב-LRU כל עוד הסשן לא השתנה ממקום אחר.
+    """
+
+    def __init__(self, cache_size: int = DECK_CACHE):
+        self.cache_size = cache_size
+        self._decks: "OrderedDict[int, Tuple[str, Deck]]" = OrderedDict()
+
+    def _load(self, uid: int) -> Tuple[Dict, Deck]:
+        sess = SESSIONS.get(uid)
+        raw = sess.get("deck")
+        key = raw["d"] if raw else ""
+        hit = self._decks.get(uid)
+        if hit is not None and hit[0] == key:
+            deck = hit[1]
+            deck.cursor = raw["c"] if raw else 0
+            self._decks.move_to_end(uid)
+        else:
+            deck = Deck.decode(raw)
+            self._remember(uid, key, deck)
+        return sess, deck
+
+    def _remember(self, uid: int, key: str, deck: Deck) -> None:
+        self._decks[uid] = (key, deck)
+        self._decks.move_to_end(uid)
+        if len(self._decks) > self.cache_size:
+            self._decks.popitem(last=False)
+
+    def _save(self, uid: int, sess: Dict, deck: Deck) -> None:
+        sess["deck"] = deck.encode()
+        SESSIONS.put(uid, sess)
+        self._remember(uid, sess["deck"]["d"], deck)
+
+    @staticmethod
+    def _permutation(uid: int, n: int) -> Tuple[int, int]:
+        h = int.from_bytes(hashlib.sha1(str(uid).encode()).digest()[:8], "big")
+        a = h % n or 1
+        while gcd(a, n) != 1:
+            a = a % n + 1
+        return a, (h >> 32) % n
+
+    def pick(self, uid: int, k: int) -> List[str]:
+        questions = BANK.all()
+        n = len(questions)
+        if not n:
+            return []
+        k = min(k, n)
+        sess, deck = self._load(uid)
+        now = _now_min()
+
+        out: List[str] = []
+        for slot in deck.due_slots(k, now):
+            qid = _qid(deck.ids[slot])
+            if BANK.get(qid) is not None:           # שאלה שהוסרה מהמאגר – מדלגים
+                out.append(qid)
+        PICKS.inc("due", amount=len(out))
+
+        a, b = self._permutation(uid, n)
+        start, fresh = deck.cursor, 0
+        limit = min(n, SCAN_LIMIT) if len(deck) < n else 0      # ראה את כל המאגר – אין מה לסרוק
+        while len(out) < k and deck.cursor - start < limit:
+            q = questions[(a * deck.cursor + b) % n]
+            deck.cursor += 1
+            if not deck.seen(_qnum(q["id"])) and q["id"] not in out:
+                out.append(q["id"])
+                fresh += 1
+        PICKS.inc("new", amount=fresh)
+
+        if len(out) < k:
+            early = [_qid(deck.ids[s]) for s in deck.due_slots(k + len(out), now, early=True)]
+            extra = [qid for qid in early if qid not in out and BANK.get(qid) is not None][:k - len(out)]
+            out += extra
+            PICKS.inc("early", amount=len(extra))
+
+        self._save(uid, sess, deck)
+        return out
+
+    def record(self, uid: int, qid: str, result: str) -> None:
+        """result: "correct" / "wrong" / "skipped"."""
+        sess, deck = self._load(uid)
+        qnum = _qnum(qid)
+        slot = deck._slot.get(qnum)
+        box = deck.box[slot] if slot is not None else 0
+        if result == "correct":
+            box += 1 if slot is not None else 2      # נכון בפעם הראשונה → מתחילים מקופסה מתקדמת
+        elif result == "wrong":
+            box = 0
+        delay = SKIP_DELAY_MIN if result == "skipped" else INTERVALS_MIN[min(box, len(INTERVALS_MIN) - 1)]
+        deck.record(qnum, box, _now_min() + delay)
+        self._save(uid, sess, deck)
+
+
+SCHEDULER = Scheduler()
@@ -0,0 +1,170 @@
+# bot/sessions.py  –  מצב לכל משתמש: ממשק אחד, מימוש בזיכרון (LRU + TTL) ומימוש SQLite (WAL, כתיבה במנות)
+import os, json, time, sqlite3, threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+SESSION_STORE     = os.getenv("SESSION_STORE", "memory")      # memory | sqlite
+SESSION_DB        = os.getenv("SESSION_DB", "data/sessions.sqlite3")
+SESSION_TTL_SECS  = int(os.getenv("SESSION_TTL_SECS", str(30 * 24 * 3600)))
+SESSION_MEM_ITEMS = int(os.getenv("SESSION_MEM_ITEMS", "10000"))
+FLUSH_SECS        = float(os.getenv("SESSION_FLUSH_SECS", "1.0"))   # גם החלון שבו worker אחר רואה ערך ישן
+FLUSH_BATCH       = 200
+BUSY_SECS         = float(os.getenv("SQLITE_BUSY_SECS", "2.0"))  # המתנה לנעילת כתיבה של worker אחר
+
+# סשן הוא dict קטן שעובר JSON, למשל {"usage": [ts, ...], "set": <set_id>}.
+# שאלות לא נשמרות בסשן – רק מזהים של סטים (bot/quiz.py).
+
+
+class SessionStore(ABC):
+    @abstractmethod
+    def get(self, uid: int) -> Dict:
+        """מחזיר עותק של הסשן (dict ריק למשתמש חדש)."""
+
+    @abstractmethod
+    def put(self, uid: int, session: Dict) -> None: ...
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+
+class MemorySessionStore(SessionStore):
+    """OrderedDict לפי סדר גישה; משתמשים שלא נגעו בבוט SESSION_TTL_SECS נזרקים, וכך גם העודף מעל max_items."""
+
+    def __init__(self, max_items: int = SESSION_MEM_ITEMS, ttl: float = SESSION_TTL_SECS):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._data: "OrderedDict[int, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _evict(self, now: float) -> None:
+        while self._data:
+            uid, (touched, _) = next(iter(self._data.items()))
+            if len(self._data) <= self.max_items and now - touched < self.ttl:
+                break
+            del self._data[uid]
+            self.evictions += 1
+
+    def peek(self, uid: int):
+        with self._lock:
+            hit = self._data.get(uid)
+            if hit is None or time.time() - hit[0] >= self.ttl:
+                return None
+            self._data.move_to_end(uid)
+            return dict(hit[1])
+
+    def get(self, uid: int) -> Dict:
+        hit = self.peek(uid)
+        return hit if hit is not None else {}
+
+    def put(self, uid: int, session: Dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._data[uid] = (now, dict(session))
+            self._data.move_to_end(uid)
+            self._evict(now)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    קובץ SQLite במצב WAL, כך שכמה תהליכי בוט יכולים לקרוא ולכתוב יחד.
+    put נכנס לרשימת "מלוכלכים"; thread ברקע כותב אותה לדיסק במנה אחת כל FLUSH_SECS (מוקדם יותר כשיש
+    FLUSH_BATCH שינויים, ובסגירה). מנה שנכשלה (DB נעול) חוזרת לרשימה ונכתבת בסבב הבא. אין cache לקריאה: get קורא את השינויים שלנו שעוד לא נכתבו, ואחרת
+    את השורה מה-DB (שליפה לפי מפתח) – כך worker אחר לא קורא usage / deck ישנים ודורס אותם.
+    """
+
+    def __init__(self, path: str = SESSION_DB, ttl: float = SESSION_TTL_SECS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl
+        self._db = sqlite3.connect(path, timeout=BUSY_SECS, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " uid INTEGER PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated)")
+        self._dirty: Dict[int, Tuple[float, Dict]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="sessions-flush", daemon=True)
+        self._flusher.start()
+
+    def get(self, uid: int) -> Dict:
+        with self._lock:
+            pending = self._dirty.get(uid)
+            if pending is not None:
+                return dict(pending[1])
+            row = self._db.execute(
+                "SELECT data FROM sessions WHERE uid = ? AND updated > ?", (uid, time.time() - self.ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def put(self, uid: int, session: Dict) -> None:
+        with self._lock:
+            self._dirty[uid] = (time.time(), dict(session))
+            due = len(self._dirty) >= FLUSH_BATCH
+        if due:
+            # הכתיבה עצמה ב-thread – handler לא מחכה לנעילה של worker אחר ולא נופל עליה
+            self._wake.set()
+
+    def _flush_loop(self) -> None:
+        # בלי זה השינויים האחרונים לפני שקט נשארים רק בזיכרון עד הסגירה
+        while not self._stop.is_set():
+            self._wake.wait(FLUSH_SECS)
+            self._wake.clear()
+            self._try_flush()
+
+    def _try_flush(self) -> None:
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            print("❌ שגיאה בכתיבת סשנים (ננסה שוב):", e)
+
+    def flush(self) -> None:
+        # הכול תחת נעילה אחת, כדי שמנה ישנה לא תיכתב אחרי מנה חדשה יותר
+        with self._lock:
+            batch, self._dirty = self._dirty, {}
+            if not batch:
+                return
+            rows = [(uid, json.dumps(s, ensure_ascii=False), ts) for uid, (ts, s) in batch.items()]
+            try:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._db.executemany(
+                    "INSERT INTO sessions(uid, data, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(uid) DO UPDATE SET data = excluded.data, updated = excluded.updated",
+                    rows,
+                )
+                self._db.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - self.ttl,))
+                self._db.execute("COMMIT")
+            except sqlite3.Error:
+                # בלי ROLLBACK החיבור נשאר בתוך BEGIN וכל flush הבא נכשל; המנה חוזרת בלי לדרוס שינוי חדש יותר
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                for uid, pending in batch.items():
+                    self._dirty.setdefault(uid, pending)
+                raise
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._flusher.join()
+        self._try_flush()
+        self._db.close()
+
+
+def make_store(kind: str = SESSION_STORE) -> SessionStore:
+    if kind == "sqlite":
+        return SQLiteSessionStore()
+    return MemorySessionStore()
+
+
+SESSIONS = make_store()
@@ -0,0 +1,43 @@
+# bot/singleflight.py  –  איחוד בקשות זהות שרצות במקביל (single-flight)
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    בקשה ראשונה למפתח מריצה את fn כ-Task; כל בקשה נוספת לאותו מפתח בזמן שה-Task רץ
+    ממתינה לאותה תוצאה (או חריגה) במקום להריץ שוב.
+    ה-Task מוגן ב-shield, כך שביטול של ממתין אחד לא מבטל את היצירה לאחרים.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.stats: Dict[str, int] = {"leaders": 0, "coalesced": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+            self.stats["leaders"] += 1
+        else:
+            self._waiters[key] += 1
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._waiters.pop(key, None)
+        if not task.cancelled():
+            task.exception()   # כדי שלא יודפס "exception was never retrieved" אם כל הממתינים בוטלו
+
+    def running(self, key: str) -> bool:
+        return key in self._inflight
+
+    def inflight(self) -> Dict[str, int]:
+        """מפתח → כמה בקשות מצטרפות ממתינות כרגע לאותה יצירה."""
+        return dict(self._waiters)
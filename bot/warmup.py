@@ -0,0 +1,45 @@
+# bot/warmup.py  –  חימום אחרי עלייה: טוען ברקע את מה שה-import של הבוט דוחה, כדי שהמשתמש הראשון לא ישלם עליו
+import os, time, asyncio
+from typing import Awaitable, Callable
+
+from bot import llm, workers
+from bot.bank import BANK
+from bot.extract import preload
+from bot.metrics import Observed
+
+WARMUP_ENABLED = os.getenv("WARMUP", "1") != "0"
+
+# שלב → משך בשניות (או שגיאה); "total" נכתב בסוף
+stats = {"steps": {}, "total": 0.0, "done": False}
+
+
+async def _step(name: str, fn: Callable[[], Awaitable]) -> None:
+    t0 = time.perf_counter()
+    try:
+        await fn()
+        stats["steps"][name] = round(time.perf_counter() - t0, 3)
+    except Exception as e:
+        # חימום שנכשל רק אומר שהמשתמש הראשון יטען את זה בעצמו
+        stats["steps"][name] = f"error: {e}"
+        print(f"⚠️ warm-up {name} נכשל:", e)
+
+
+async def warm_up() -> None:
+    """
+    רץ כ-task ברקע אחרי שהבוט כבר מקבל עדכונים (app.py). ה-import של openai ויצירת ה-client
+    וטעינת המאגר רצים ב-thread, הפענוח בתהליכי ה-pool – ה-event loop נשאר פנוי לעדכונים.
+    """
+    if not WARMUP_ENABLED or stats["done"]:
+        return
+    t0 = time.perf_counter()
+    # pypdf / docx / pptx בכל תהליך של ה-pool – ה-fork והייבוא קורים עכשיו ולא בהעלאה הראשונה.
+    # ראשון: ה-fork קורה לפני ש-openai נטען, כך שהתהליכים נשארים קטנים
+    await _step("parsers", lambda: asyncio.to_thread(workers.prestart, preload))
+    await _step("openai", lambda: asyncio.to_thread(llm.get_client))
+    await _step("bank", lambda: asyncio.to_thread(BANK.all))
+    stats["total"] = round(time.perf_counter() - t0, 3)
+    stats["done"] = True
+    print(f"🔥 warm-up הסתיים ב-{stats['total']}s:", stats["steps"])
+
+
+Observed("edugo_warmup_done", "1 once the post-start warm-up has finished.", lambda: int(stats["done"]))
@@ -0,0 +1,39 @@
+# bot/workers.py  –  הרצת עבודה כבדה (פענוח קבצים) מחוץ ל-event loop
+import os, asyncio, threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+# כמה קבצים מפוענחים במקביל (גם מספר התהליכים ב-pool)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "2"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()      # prestart יוצר את ה-pool מתוך thread
+_extract_sem = asyncio.Semaphore(EXTRACT_WORKERS)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+        return _pool
+
+
+def prestart(fn: Callable) -> list:
+    """מעלה את תהליכי ה-pool ומריץ fn() בכל אחד. חוסם – מריצים ב-thread, כדי שה-fork לא יעצור את ה-loop."""
+    pool = _get_pool()
+    return [f.result() for f in [pool.submit(fn) for _ in range(EXTRACT_WORKERS)]]
+
+
+async def run_in_process(fn: Callable, *args):
+    """מריץ fn(*args) בתהליך נפרד; לכל היותר EXTRACT_WORKERS במקביל, השאר ממתינים בתור."""
+    async with _extract_sem:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), fn, *args)
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None